@@ -8,12 +8,14 @@ Created on Sat Aug  9 15:58:40 2025
 
 # app.py
 # -*- coding: utf-8 -*-
+import html
+import time
 import streamlit as st
-from io import BytesIO
 from pathlib import Path
-import streamlit.components.v1 as components
 
-from parser import processar_pdf  # <- sua função já pronta
+from exportacao import FORMATOS, formatos_disponiveis, para_buffer, texto_tsv
+from parser import EstatisticasParser, competencia_do_arquivo, processar_pdf, validar_competencia
+from tarefas import FilaProcessamento  # <- pool em segundo plano + cache por conteúdo
 
 # ===== Config / versão =====
 APP_VERSION = "v1.0.0"  # altere aqui sempre que fizer mudanças
@@ -29,94 +31,175 @@ st.markdown(
             {APP_VERSION}
         </span>
     </div>
-    <div style="margin-top:6px; color:#666;">Selecione sua fatura em PDF. Eu converto para planilha (CSV).</div>
+    <div style="margin-top:6px; color:#666;">Selecione suas faturas em PDF. Eu converto para planilha (CSV).</div>
     """,
     unsafe_allow_html=True,
 )
 
-pdf_file = st.file_uploader("Importar PDF da fatura", type=["pdf"])
 
-if pdf_file is not None:
-    st.info("Arquivo recebido. Clique em **Processar PDF** para iniciar.")
+@st.cache_resource(show_spinner=False)
+def fila_processamento() -> FilaProcessamento:
+    # Uma fila (e um pool de processos) por servidor, compartilhada por todas as sessões:
+    # um extrato longo de um usuário não trava o script dos outros, e o mesmo PDF
+    # (mesmo SHA-256) enviado por duas pessoas é processado uma vez só.
+    # 2º nível: cache em disco por PDF e por página (cache.py), dentro do worker.
+    return FilaProcessamento()
+
+
+def mostrar_resultado(df, nome: str, chave: str, stats=None) -> None:
+    # Preview
+    st.success(f"{nome}: {len(df)} linhas extraídas.")
+    st.dataframe(df, use_container_width=True)
+    
+    try:
+        total_valor = df["Valor (R$)"].replace(",", ".", regex=True).astype(float).sum()
+        st.markdown(
+        f"**💰 Total dos lançamentos: R$ {total_valor:,.2f}**"
+        .replace(",", "X").replace(".", ",").replace("X", ".")
+        )
+    except Exception as e:
+        st.warning(f"Não foi possível calcular o total: {e}")
+
+    # ===== Nome do arquivo de saída: mesmo do PDF, extensão do formato =====
+    # Ex.: "Fatura_Itau_20250807-153014.pdf" -> "Fatura_Itau_20250807-153014.csv"
+    base_name = Path(nome).stem + FORMATOS[formato].extensao
+
+    # Parquet/Arrow: a data tipada precisa do ano (competência da barra lateral ou do nome do PDF)
+    comp = competencia or competencia_do_arquivo(nome)
+    if FORMATOS[formato].colunar and comp is None:
+        st.info(f"{nome}: informe a competência na barra lateral para a coluna de data vir preenchida.")
+
+    # Exporta em blocos direto para um único buffer (sem string intermediária)
+    st.download_button(
+        label=f"Baixar planilha ({formato.upper()})",
+        data=para_buffer(df, formato, comp),
+        file_name=base_name,
+        mime=FORMATOS[formato].mime,
+        key=f"baixar-{chave}",
+    )
+
+    # ===== Botão: Copiar tabela para a área de transferência =====
+    # Dica: TSV (tab-separated) cola super bem no Excel mantendo vírgulas decimais.
+    tsv = html.escape(texto_tsv(df))
+    import streamlit.components.v1 as components  # só quando há tabela para copiar
+
+    components.html(
+        f"""
+        <div>
+          <button id="copy-btn" style="
+              margin-top:10px;
+              padding:8px 12px;
+              border-radius:8px;
+              border:1px solid #cbd5e1;
+              background:#f8fafc;
+              cursor:pointer;">
+             📎 Copiar tabela
+          </button>
+          <span id="copy-msg" style="margin-left:8px; color:#16a34a;"></span>
+          <textarea id="tsv-data" style="position:absolute; left:-10000px; top:-10000px;">{tsv}</textarea>
+        </div>
+        <script>
+          const btn = document.getElementById("copy-btn");
+          const msg = document.getElementById("copy-msg");
+          const data = document.getElementById("tsv-data").value;
+          btn.addEventListener("click", async () => {{
+            try {{
+              await navigator.clipboard.writeText(data);
+              msg.textContent = "Copiado!";
+              setTimeout(() => msg.textContent = "", 2000);
+            }} catch (e) {{
+              msg.style.color = "#dc2626";
+              msg.textContent = "Falha ao copiar";
+              setTimeout(() => msg.textContent = "", 3000);
+            }}
+          }});
+        </script>
+        """,
+        height=60,
+    )
+
+    st.caption("Dica: após copiar, abra o Excel e cole (Ctrl/Cmd+V).")
+
+    if stats is not None:
+        with st.expander("Depuração: estatísticas do parser", expanded=True):
+            st.json(stats.resumo())
+            st.caption("Tempo por página e etapa (ms)")
+            st.dataframe(stats.por_pagina(), use_container_width=True)
+
+
+pdf_files = st.file_uploader("Importar PDFs das faturas", type=["pdf"], accept_multiple_files=True)
+depurar = st.sidebar.checkbox("Modo depuração", help="Processa sem cache e mostra tempos e contadores do parser.")
+formato = st.sidebar.selectbox(
+    "Formato do download", formatos_disponiveis(),
+    help="CSV abre no Excel; Parquet/Arrow trazem valor em centavos e datas tipadas, para análise.",
+)
+competencia = None
+if FORMATOS[formato].colunar:
+    competencia = st.sidebar.text_input(
+        "Competência (AAAA-MM)", placeholder="do nome do arquivo",
+        help="Mês da fatura, para dar ano às datas dd/mm. Em branco, sai do nome de cada PDF.",
+    ).strip() or None
+    if competencia:
+        try:
+            validar_competencia(competencia)
+        except ValueError as e:
+            st.sidebar.error(str(e))
+            competencia = None
+
+if pdf_files:
+    st.info(f"{len(pdf_files)} arquivo(s) recebido(s). Clique em **Processar PDF** para iniciar.")
     if st.button("Processar PDF"):
-        with st.spinner("Processando..."):
-            # Salva o upload em memória temporária (Streamlit já fornece o buffer)
-            # Para o parser, precisamos escrever em disco ou passar um caminho temporário.
-            # Aqui usamos NamedTemporaryFile para caminho real.
-            import tempfile
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-                tmp.write(pdf_file.read())
-                tmp_path = tmp.name
-
-            # Processa
-            df = processar_pdf(tmp_path)
-
-            # Preview
-            st.success(f"Processado! {len(df)} linhas extraídas.")
-            st.dataframe(df, use_container_width=True)
-            
-            try:
-                total_valor = df["Valor (R$)"].replace(",", ".", regex=True).astype(float).sum()
-                st.markdown(
-                f"**💰 Total dos lançamentos: R$ {total_valor:,.2f}**"
-                .replace(",", "X").replace(".", ",").replace("X", ".")
-                )
-            except Exception as e:
-                st.warning(f"Não foi possível calcular o total: {e}")
-
-            # ===== Nome do arquivo de saída: mesmo do PDF, extensão .csv =====
-            # Ex.: "Fatura_Itau_20250807-153014.pdf" -> "Fatura_Itau_20250807-153014.csv"
-            base_name = Path(pdf_file.name).stem + ".csv"
-
-            # Gera CSV em memória
-            buffer = BytesIO()
-            buffer.write(df.to_csv(index=False).encode("utf-8-sig"))
-            buffer.seek(0)
-            
-            st.download_button(
-                label="Baixar planilha (CSV)",
-                data=buffer,
-                file_name=str(Path(base_name).with_suffix(".csv")),
-                mime="text/csv",
-            )
-
-            # ===== Botão: Copiar tabela para a área de transferência =====
-            # Dica: TSV (tab-separated) cola super bem no Excel mantendo vírgulas decimais.
-            tsv = df.to_csv(index=False, sep="\t")
-            components.html(
-                f"""
-                <div>
-                  <button id="copy-btn" style="
-                      margin-top:10px;
-                      padding:8px 12px;
-                      border-radius:8px;
-                      border:1px solid #cbd5e1;
-                      background:#f8fafc;
-                      cursor:pointer;">
-                     📎 Copiar tabela
-                  </button>
-                  <span id="copy-msg" style="margin-left:8px; color:#16a34a;"></span>
-                  <textarea id="tsv-data" style="position:absolute; left:-10000px; top:-10000px;">{tsv}</textarea>
-                </div>
-                <script>
-                  const btn = document.getElementById("copy-btn");
-                  const msg = document.getElementById("copy-msg");
-                  const data = document.getElementById("tsv-data").value;
-                  btn.addEventListener("click", async () => {{
-                    try {{
-                      await navigator.clipboard.writeText(data);
-                      msg.textContent = "Copiado!";
-                      setTimeout(() => msg.textContent = "", 2000);
-                    }} catch (e) {{
-                      msg.style.color = "#dc2626";
-                      msg.textContent = "Falha ao copiar";
-                      setTimeout(() => msg.textContent = "", 3000);
-                    }}
-                  }});
-                </script>
-                """,
-                height=60,
-            )
-
-            st.caption("Dica: após copiar, abra o Excel e cole (Ctrl/Cmd+V).")
+        if depurar:
+            # depuração: síncrono e sem cache, para medir o parser de verdade
+            st.session_state["tarefas"] = []
+            vistas = set()
+            for pdf_file in pdf_files:
+                chave = FilaProcessamento.chave(pdf_file.getvalue())
+                if chave in vistas:  # mesmo PDF duas vezes: uma só (a chave do botão é por PDF)
+                    continue
+                vistas.add(chave)
+                with st.spinner(f"Processando {pdf_file.name}..."):
+                    stats = EstatisticasParser()
+                    df = processar_pdf(pdf_file.getvalue(), stats=stats)
+                st.subheader(pdf_file.name)
+                mostrar_resultado(df, pdf_file.name, chave, stats)
+        else:
+            # Cada arquivo vira uma tarefa em segundo plano; o reenvio do mesmo PDF reaproveita a tarefa
+            fila = fila_processamento()
+            tarefas, vistas = [], set()
+            for f in pdf_files:
+                chave = fila.enviar(f.getvalue())
+                if chave not in vistas:  # o mesmo PDF duas vezes no upload aparece uma vez
+                    vistas.add(chave)
+                    tarefas.append((f.name, chave))
+            st.session_state["tarefas"] = tarefas
+
+# ===== Tarefas desta sessão: resultado de quem terminou, progresso de quem não =====
+tarefas = st.session_state.get("tarefas", [])
+pendentes = False
+if tarefas:
+    fila = fila_processamento()
+    for nome, chave in tarefas:
+        estado = fila.estado(chave)
+        if estado == "pronta":
+            st.subheader(nome)
+            mostrar_resultado(fila.resultado(chave), nome, chave)
+        elif estado == "erro":
+            st.error(f"{nome}: não foi possível processar ({type(fila.erro(chave)).__name__}: {fila.erro(chave)})")
+        elif estado == "desconhecida":
+            st.warning(f"{nome}: o resultado saiu da memória; clique em **Processar PDF** de novo.")
+        else:
+            pendentes = True
+            feitas, total = fila.progresso(chave)
+            if estado == "na_fila":
+                texto = f"{nome}: aguardando na fila"
+            elif total:
+                texto = f"{nome}: página {feitas} de {total}"
+            else:
+                texto = f"{nome}: abrindo o PDF"
+            st.progress(feitas / total if total else 0.0, text=texto)
 
+if pendentes:
+    # Reexecuta o script só desta sessão para atualizar o progresso; os workers seguem sozinhos
+    time.sleep(1.0)
+    st.rerun()
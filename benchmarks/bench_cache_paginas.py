@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark do cache por página (cache.processar_pdf_paginas).
+
+Num diretório de cache vazio, processa uma fatura sintética (frio), a mesma
+fatura de novo (todas as páginas do cache) e uma reemissão com só a primeira
+página alterada. Confere cada saída com processar_pdf e imprime tempo e páginas
+reaproveitadas.
+
+Uso:
+    python benchmarks/bench_cache_paginas.py -n 20 -m 40 -a 4 --backend pdfium
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import parser as fatura  # noqa: E402
+from cache import CachePaginas, processar_pdf_paginas  # noqa: E402
+from gerar_fatura import gerar_fatura  # noqa: E402
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Tempo do cache por página: frio, repetido e reemissão.")
+    ap.add_argument("-n", "--paginas", type=int, default=20)
+    ap.add_argument("-m", "--transacoes", type=int, default=40, help="lançamentos por página")
+    ap.add_argument("-a", "--anexos", type=int, default=4, help="páginas sem lançamentos")
+    ap.add_argument("--backend", choices=sorted(fatura.BACKENDS), default="pdfplumber")
+    args = ap.parse_args()
+
+    original = gerar_fatura(args.paginas, args.transacoes, seed=args.paginas, anexos=args.anexos)
+    reemitida = gerar_fatura(args.paginas, args.transacoes, seed=args.paginas, anexos=args.anexos, reemissao=1)
+    falhas = 0
+    with tempfile.TemporaryDirectory() as d:
+        cache = CachePaginas(d)
+        for nome, pdf in (("frio", original), ("repetido", original), ("reemissão", reemitida)):
+            stats = fatura.EstatisticasParser()
+            t0 = time.perf_counter()
+            df = processar_pdf_paginas(pdf, cache, stats, backend=args.backend)
+            seg = time.perf_counter() - t0
+            ok = df.equals(fatura.processar_pdf(pdf, backend=args.backend))
+            falhas += not ok
+            reaproveitadas = stats.resumo()["contadores"].get("paginas_cache", 0)
+            print(f"{nome:<10} {seg * 1000:8.0f} ms  {reaproveitadas:3d}/{args.paginas + args.anexos} páginas do cache"
+                  f"  {'ok' if ok else 'DIFERENTE de processar_pdf'}")
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
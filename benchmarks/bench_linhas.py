@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Microbenchmark da classificação de linhas da passada 1.
+
+Compara o laço antigo (uma regex atrás da outra em toda linha, copiado abaixo
+como referência) com parser._passada_1_linhas (classificar_linha), sobre as
+linhas de uma fatura sintética. Confere que os dois produzem o mesmo resultado
+e imprime linhas/s de cada um.
+
+Uso:
+    python benchmarks/bench_linhas.py -n 40 -m 60 -r 5
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List, Optional
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import parser as fatura  # noqa: E402
+from gerar_fatura import gerar_fatura  # noqa: E402
+from parser import (  # noqa: E402
+    IOF_SEM_CARTAO, RX_CARTAO_HEADER_1, RX_CARTAO_HEADER_2, RX_FIM_CP, RX_INT_IGNORAR, RX_INT_IOF,
+    RX_INT_TITULO, RX_TRANSACAO, ResultadoPagina, Transacao, valor_para_centavos, valor_para_float,
+)
+
+
+def _detectar_cartao_referencia(linha: str, cartao_atual: Optional[str]) -> Optional[str]:
+    m1 = RX_CARTAO_HEADER_1.search(linha)
+    if m1:
+        return m1.group(1)
+    m2 = RX_CARTAO_HEADER_2.search(linha)
+    if m2:
+        return m2.group(1)
+    return cartao_atual
+
+
+def _linhas_referencia(text: str, page_idx: int, res: ResultadoPagina) -> None:
+    # laço da passada 1 antes do classificar_linha
+    cartao: Optional[str] = None
+    em_internacionais = False
+    for ln in text.split("\n"):
+        cartao = _detectar_cartao_referencia(ln, cartao)
+        if RX_INT_TITULO.search(ln):
+            em_internacionais = True
+            if cartao:
+                res.iof_p1.append((cartao, 0.0))
+            res.iof_p1.append((IOF_SEM_CARTAO, 0.0))
+            continue
+        if em_internacionais:
+            if any(rx.search(ln) for rx in RX_FIM_CP) or RX_CARTAO_HEADER_1.search(ln):
+                em_internacionais = False
+                continue
+            m_iof = RX_INT_IOF.search(ln)
+            if m_iof:
+                res.iof_p1.append((cartao if cartao else IOF_SEM_CARTAO, valor_para_float(m_iof.group(1))))
+                continue
+            if any(rx.search(ln) for rx in RX_INT_IGNORAR):
+                continue
+            mtx = RX_TRANSACAO.match(ln)
+            if mtx:
+                data, estabelecimento, valor = mtx.groups()
+                res.passada_1.append(Transacao(data, estabelecimento.strip(), valor_para_centavos(valor), 1, page_idx, 1, cartao))
+            continue
+        m = RX_TRANSACAO.match(ln)
+        if m:
+            data, estabelecimento, valor = m.groups()
+            res.passada_1.append(Transacao(data, estabelecimento.strip(), valor_para_centavos(valor), 1, page_idx, 1, cartao))
+
+
+def _rodar(func: Callable, textos: List[str]) -> List[ResultadoPagina]:
+    resultados = []
+    for idx, texto in enumerate(textos, start=1):
+        res = ResultadoPagina([], [], [], [], [], set())
+        func(texto, idx, res)
+        resultados.append(res)
+    return resultados
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Linhas/s da passada 1: laço antigo x classificar_linha.")
+    ap.add_argument("-n", "--paginas", type=int, default=40)
+    ap.add_argument("-m", "--transacoes", type=int, default=60, help="lançamentos por página")
+    ap.add_argument("-r", "--repeticoes", type=int, default=5)
+    args = ap.parse_args()
+
+    pdf = gerar_fatura(args.paginas, args.transacoes, seed=args.paginas)
+    textos = [fatura.varrer_blocos(p.texto, fatura.REGRAS_PASSADA_1)[0] for p in fatura.extrair_paginas(pdf)]
+    # repete as páginas para o tempo não ficar no ruído
+    textos = textos * max(1, 20000 // max(1, sum(t.count("\n") + 1 for t in textos)))
+    n_linhas = sum(t.count("\n") + 1 for t in textos)
+
+    if _rodar(_linhas_referencia, textos) != _rodar(fatura._passada_1_linhas, textos):
+        print("ERRO: classificar_linha diverge do laço antigo", file=sys.stderr)
+        return 1
+
+    print(f"{n_linhas} linhas ({args.paginas} páginas x {args.transacoes} lançamentos, repetidas)")
+    tempos = {}
+    for nome, func in (("antes", _linhas_referencia), ("depois", fatura._passada_1_linhas)):
+        amostras = []
+        for _ in range(args.repeticoes):
+            t0 = time.perf_counter()
+            _rodar(func, textos)
+            amostras.append(time.perf_counter() - t0)
+        tempos[nome] = statistics.median(amostras)
+        print(f"  {nome:<7} {tempos[nome] * 1000:9.2f} ms  {n_linhas / tempos[nome]:12,.0f} linhas/s")
+    print(f"  ganho   {tempos['antes'] / tempos['depois']:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pico de memória (RSS) de processar_pdf em função do número de páginas.
+
+Cada medida roda num processo limpo: importa parser/pandas/pdfplumber, anota o
+RSS de base, processa a fatura sintética e informa o pico (ru_maxrss). Compara
+o modo normal com pouca_memoria=True; --limite-rss-mb testa também o orçamento.
+
+Uso:
+    python benchmarks/bench_memoria.py -p 10 50 100 200 --backend pdfium
+    python benchmarks/bench_memoria.py -p 200 --limite-rss-mb 400
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from gerar_fatura import gerar_fatura  # noqa: E402
+
+# roda no processo filho: argv = pdf, backend, pouca_memoria (0/1), limite ("" = sem)
+FILHO = """
+import json, resource, sys, time
+import pandas, pdfplumber
+import parser
+pdf, backend, pouca, limite = sys.argv[1], sys.argv[2], sys.argv[3] == "1", sys.argv[4]
+base = parser.rss_mb()
+t0 = time.perf_counter()
+erro = None
+try:
+    n = len(parser.processar_pdf(pdf, backend=backend, pouca_memoria=pouca,
+                                 limite_rss_mb=float(limite) if limite else None))
+except parser.LimiteMemoriaExcedido as e:
+    n, erro = 0, str(e)
+pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(json.dumps({"base": base, "pico": pico, "linhas": n, "seg": time.perf_counter() - t0, "erro": erro}))
+"""
+
+
+def medir(pdf: Path, backend: str, pouca_memoria: bool, limite: str) -> dict:
+    proc = subprocess.run(
+        [sys.executable, "-c", FILHO, str(pdf), backend, "1" if pouca_memoria else "0", limite],
+        cwd=RAIZ, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:])
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Pico de RSS x páginas, modo normal e pouca_memoria.")
+    ap.add_argument("-p", "--paginas", type=int, nargs="+", default=[10, 50, 100, 200])
+    ap.add_argument("-m", "--transacoes", type=int, default=60, help="lançamentos por página")
+    ap.add_argument("--backend", default="pdfplumber")
+    ap.add_argument("--limite-rss-mb", default="", help="orçamento de RSS para o modo pouca_memoria")
+    args = ap.parse_args()
+
+    modos = [("normal", False), ("pouca_memoria", True)]
+    print(f"{'páginas':>7} {'modo':<14} {'base MB':>8} {'pico MB':>8} {'Δ MB':>7} {'seg':>7}  linhas")
+    with tempfile.TemporaryDirectory() as d:
+        for n in args.paginas:
+            pdf = Path(d) / f"fatura_{n}.pdf"
+            pdf.write_bytes(gerar_fatura(n, args.transacoes, seed=n))
+            for nome, pouca in modos:
+                r = medir(pdf, args.backend, pouca, args.limite_rss_mb if pouca else "")
+                fim = f"  {r['linhas']}" if not r["erro"] else f"  ESTOUROU: {r['erro']}"
+                print(f"{n:>7} {nome:<14} {r['base']:8.0f} {r['pico']:8.0f} {r['pico'] - r['base']:7.0f} "
+                      f"{r['seg']:7.2f}{fim}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark do parser sobre faturas sintéticas (benchmarks/gerar_fatura.py).
+
+Mede, por cenário (N páginas x M lançamentos por página): extração de layout,
+cada uma das três passadas, a finalização (IOF/stoplist/dedupe) e o tempo ponta
+a ponta de processar_pdf, com vazão em páginas/s e faturas/s.
+
+Uso:
+    python benchmarks/bench_parser.py                       # roda e imprime
+    python benchmarks/bench_parser.py --salvar base         # grava baselines/base.json
+    python benchmarks/bench_parser.py --comparar base       # compara com a baseline
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import pandas as pd  # noqa: E402
+import pdfplumber  # noqa: E402
+
+import parser as fatura  # noqa: E402
+from gerar_fatura import gerar_fatura  # noqa: E402
+
+BASELINES = Path(__file__).resolve().parent / "baselines"
+
+# nome: (páginas com lançamentos, lançamentos por página, páginas sem lançamentos)
+CENARIOS = {
+    "pequena": (2, 30, 0),
+    "media": (10, 40, 0),
+    "grande": (40, 60, 0),
+    "com_anexos": (10, 40, 6),
+}
+
+ETAPAS = ["extracao", "passada_1", "passada_2", "passada_3", "finalizacao", "ponta_a_ponta"]
+
+
+def _cronometrar(func: Callable[[], object], repeticoes: int) -> float:
+    """Mediana de `repeticoes` execuções, em segundos."""
+    tempos = []
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        func()
+        tempos.append(time.perf_counter() - t0)
+    return statistics.median(tempos)
+
+
+def medir_cenario(n_paginas: int, por_pagina: int, anexos: int, repeticoes: int,
+                  backend: str = "pdfplumber") -> Dict:
+    pdf = gerar_fatura(n_paginas, por_pagina, seed=n_paginas, anexos=anexos)
+    paginas = fatura.extrair_paginas(pdf, backend=backend)
+
+    def _passada(func) -> Callable[[], None]:
+        def rodar() -> None:
+            for idx, pag in enumerate(paginas, start=1):
+                res = fatura.ResultadoPagina([], [], [], [], [], set())
+                if func is fatura._passada_3:
+                    func(pag, res)
+                else:
+                    func(pag, idx, res)
+        return rodar
+
+    resultados = [fatura.processar_pagina(p, i) for i, p in enumerate(paginas, start=1)]
+
+    def finalizar() -> pd.DataFrame:
+        fin = fatura.Finalizador()
+        for res in resultados:
+            fin.adicionar(res)
+        return fin.dataframe()
+
+    tempos = {
+        "extracao": _cronometrar(lambda: fatura.extrair_paginas(pdf, backend=backend), repeticoes),
+        "passada_1": _cronometrar(_passada(fatura._passada_1), repeticoes),
+        "passada_2": _cronometrar(_passada(fatura._passada_2), repeticoes),
+        "passada_3": _cronometrar(_passada(fatura._passada_3), repeticoes),
+        "finalizacao": _cronometrar(finalizar, repeticoes),
+        "ponta_a_ponta": _cronometrar(lambda: fatura.processar_pdf(pdf, backend=backend), repeticoes),
+    }
+    total = tempos["ponta_a_ponta"]
+    return {
+        "paginas": n_paginas + anexos,
+        "lancamentos_por_pagina": por_pagina,
+        "anexos": anexos,
+        "linhas_saida": len(finalizar()),
+        "tempos_s": {k: round(v, 6) for k, v in tempos.items()},
+        "paginas_por_s": round((n_paginas + anexos) / total, 3),
+        "faturas_por_s": round(1 / total, 3),
+    }
+
+
+def imprimir(resultado: Dict) -> None:
+    for nome, c in resultado["cenarios"].items():
+        print(f"\n[{nome}] {c['paginas']} páginas x {c['lancamentos_por_pagina']} lançamentos "
+              f"-> {c['linhas_saida']} linhas")
+        for etapa in ETAPAS:
+            print(f"  {etapa:<14} {c['tempos_s'][etapa] * 1000:10.2f} ms")
+        print(f"  {'vazão':<14} {c['paginas_por_s']:10.2f} páginas/s  {c['faturas_por_s']:.2f} faturas/s")
+
+
+def comparar(atual: Dict, base: Dict, tolerancia: float) -> List[str]:
+    """Lista as etapas que ficaram mais lentas que base * (1 + tolerancia)."""
+    regressoes = []
+    print(f"\nComparação com a baseline ({base['meta']['data']}):")
+    for nome, c in atual["cenarios"].items():
+        b = base["cenarios"].get(nome)
+        if not b:
+            continue
+        for etapa in ETAPAS:
+            t, tb = c["tempos_s"][etapa], b["tempos_s"].get(etapa)
+            if not tb:
+                continue
+            razao = t / tb
+            marca = ""
+            if razao > 1 + tolerancia:
+                marca = "  <-- REGRESSÃO"
+                regressoes.append(f"{nome}/{etapa}")
+            print(f"  {nome:<8} {etapa:<14} {tb * 1000:9.2f} -> {t * 1000:9.2f} ms  ({razao:5.2f}x){marca}")
+    return regressoes
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Benchmark do parser de faturas Itaú.")
+    ap.add_argument("--cenarios", nargs="+", choices=sorted(CENARIOS), default=sorted(CENARIOS))
+    ap.add_argument("-r", "--repeticoes", type=int, default=3)
+    ap.add_argument("--backend", choices=sorted(fatura.BACKENDS), default="pdfplumber")
+    ap.add_argument("--salvar", metavar="NOME", help="grava o resultado em baselines/NOME.json")
+    ap.add_argument("--comparar", metavar="NOME", help="compara com baselines/NOME.json")
+    ap.add_argument("--tolerancia", type=float, default=0.15, help="piora aceita antes de acusar regressão")
+    args = ap.parse_args()
+
+    resultado = {
+        "meta": {
+            "data": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "maquina": platform.platform(),
+            "pandas": pd.__version__,
+            "pdfplumber": pdfplumber.__version__,
+            "repeticoes": args.repeticoes,
+            "backend": args.backend,
+        },
+        "cenarios": {},
+    }
+    for nome in args.cenarios:
+        n_paginas, por_pagina, anexos = CENARIOS[nome]
+        resultado["cenarios"][nome] = medir_cenario(n_paginas, por_pagina, anexos, args.repeticoes, args.backend)
+    imprimir(resultado)
+
+    if args.salvar:
+        BASELINES.mkdir(exist_ok=True)
+        destino = BASELINES / f"{args.salvar}.json"
+        destino.write_text(json.dumps(resultado, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\nBaseline gravada em {destino}")
+
+    if args.comparar:
+        base = json.loads((BASELINES / f"{args.comparar}.json").read_text(encoding="utf-8"))
+        regressoes = comparar(resultado, base, args.tolerancia)
+        if regressoes:
+            print(f"\n{len(regressoes)} regressão(ões): {', '.join(regressoes)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste de carga do servidor.py: N pedidos com C clientes simultâneos.
+
+Sem --url, sobe um `python -m servidor` numa porta livre só para o teste. Imprime
+latência p50/p90/p99, vazão e a contagem por status (503 = fila cheia,
+504 = prazo estourado).
+
+Uso:
+    python benchmarks/carga_servidor.py -n 200 -c 8 -j 2
+    python benchmarks/carga_servidor.py --url http://127.0.0.1:8765 --pdf fatura.pdf
+"""
+
+import argparse
+import http.client
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Tuple
+from urllib.parse import urlsplit
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from gerar_fatura import gerar_fatura  # noqa: E402
+
+
+def _porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _esperar(host: str, porta: int, prazo: float = 60.0) -> None:
+    fim = time.monotonic() + prazo
+    while time.monotonic() < fim:
+        try:
+            conn = http.client.HTTPConnection(host, porta, timeout=2)
+            conn.request("GET", "/saude")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("servidor não respondeu a tempo")
+
+
+def _pedido(host: str, porta: int, pdf: bytes, formato: str, timeout: float) -> Tuple[int, float]:
+    t0 = time.perf_counter()
+    try:
+        conn = http.client.HTTPConnection(host, porta, timeout=timeout)
+        conn.request("POST", f"/processar?formato={formato}", body=pdf,
+                     headers={"Content-Type": "application/pdf"})
+        resp = conn.getresponse()
+        resp.read()
+        status = resp.status
+        conn.close()
+    except OSError:
+        status = 0  # conexão recusada/caída
+    return status, time.perf_counter() - t0
+
+
+def _percentil(valores: List[float], p: float) -> float:
+    if not valores:
+        return float("nan")
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, round(p / 100 * (len(ordenados) - 1)))]
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Latência p50/p99 do servidor do parser sob carga.")
+    ap.add_argument("--url", help="servidor já no ar (padrão: sobe um local)")
+    ap.add_argument("--pdf", type=Path, help="PDF enviado (padrão: fatura sintética)")
+    ap.add_argument("--paginas", type=int, default=4, help="páginas da fatura sintética")
+    ap.add_argument("-n", "--pedidos", type=int, default=100)
+    ap.add_argument("-c", "--clientes", type=int, default=4, help="pedidos simultâneos")
+    ap.add_argument("--formato", choices=["csv", "json"], default="csv")
+    ap.add_argument("-j", "--workers", type=int, default=2, help="workers do servidor local")
+    ap.add_argument("--fila", type=int, default=8, help="fila do servidor local")
+    ap.add_argument("--timeout", type=float, default=60.0, help="prazo do servidor local")
+    args = ap.parse_args()
+
+    pdf = args.pdf.read_bytes() if args.pdf else gerar_fatura(args.paginas, 40, seed=1)
+
+    proc = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, porta = url.hostname, url.port or 80
+    else:
+        host, porta = "127.0.0.1", _porta_livre()
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "servidor", "--porta", str(porta), "-j", str(args.workers),
+             "--fila", str(args.fila), "--timeout", str(args.timeout)],
+            cwd=RAIZ,
+        )
+    try:
+        _esperar(host, porta)
+        # o 1º pedido sai à parte: mostra se o pool subiu mesmo aquecido
+        primeiro = _pedido(host, porta, pdf, args.formato, args.timeout + 10)
+
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.clientes) as ex:
+            resultados = list(ex.map(
+                lambda _: _pedido(host, porta, pdf, args.formato, args.timeout + 10), range(args.pedidos)
+            ))
+        total = time.perf_counter() - t0
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    ok = [seg for status, seg in resultados if status == 200]
+    por_status = Counter(status for status, _ in resultados)
+    print(f"\n{args.pedidos} pedidos, {args.clientes} clientes, PDF de {len(pdf) / 1024:.0f} KB em {total:.2f}s")
+    print(f"1º pedido: status {primeiro[0]}, {primeiro[1] * 1000:.0f} ms (fora das estatísticas abaixo)")
+    print("status: " + ", ".join(f"{s}={n}" for s, n in sorted(por_status.items())))
+    if ok:
+        print(f"latência (200): p50 {_percentil(ok, 50) * 1000:.0f} ms  p90 {_percentil(ok, 90) * 1000:.0f} ms  "
+              f"p99 {_percentil(ok, 99) * 1000:.0f} ms  média {statistics.mean(ok) * 1000:.0f} ms")
+    print(f"vazão: {len(ok) / total:.2f} pedidos/s")
+    return 0 if len(ok) == args.pedidos else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Gerador de faturas sintéticas no layout Itaú (duas colunas), sem dependências.
+
+Cada página tem lançamentos nas duas colunas (a passada 1 lê o início das linhas,
+a passada 2 a coluna da direita) e, em rodízio, os blocos que o parser trata à
+parte: compras parceladas (CP), "Fique atento", internacionais com IOF (com e sem
+"final" de cartão) e pagamentos. Tudo determinístico pela seed.
+
+Uso:
+    python benchmarks/gerar_fatura.py -n 20 -m 40 -o fatura_20p.pdf
+"""
+
+import argparse
+import random
+import sys
+from typing import List, Tuple
+
+LARGURA, ALTURA = 595.0, 842.0
+X_COL1, X_COL2 = 40.0, 310.0
+ESTABS = [
+    "SUPERMERCADO PAO DOURADO", "POSTO IPIRANGA", "FARMÁCIA SÃO JOÃO", "IFOOD *RESTAURANTE",
+    "UBER *TRIP", "AMAZON BR", "LOJAS AMERICANAS", "PADARIA AÇÚCAR", "NETFLIX.COM", "DROGASIL",
+    "CINEMARK", "LIVRARIA CULTURA", "MERCADOLIVRE*VENDEDOR", "SPOTIFY", "ESTACIONAMENTO CENTRO",
+]
+
+Texto = Tuple[float, float, str]   # (x, y, texto)
+
+
+def _valor(rng: random.Random, maximo: float = 2500.0) -> str:
+    v = round(rng.uniform(1, maximo), 2)
+    return f"{v:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def _transacao(rng: random.Random) -> List[str]:
+    d = f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}"
+    return [d, rng.choice(ESTABS), _valor(rng)]
+
+
+class _Coluna:
+    def __init__(self, x: float):
+        self.x = x
+        self.y = ALTURA - 60
+        self.itens: List[Texto] = []
+
+    def linha(self, *partes: str, desloc: Tuple[float, ...] = (0, 38, 190)) -> None:
+        for dx, p in zip(desloc, partes):
+            self.itens.append((self.x + dx, self.y, p))
+        self.y -= 14
+
+    def texto(self, s: str) -> None:
+        self.linha(s, desloc=(0,))
+
+    def cheia(self) -> bool:
+        return self.y < 60
+
+
+def _pagina(rng: random.Random, n_trans: int, cartoes: List[str], num: int) -> List[Texto]:
+    c1, c2 = _Coluna(X_COL1), _Coluna(X_COL2)
+    cartao = cartoes[(num - 1) % len(cartoes)]
+    sem_cartao = num % 5 == 0  # página sem cabeçalho de cartão: IOF vai para o genérico
+    if not sem_cartao:
+        c1.texto(f"Lançamentos no cartão (final {cartao})")
+    c1.texto("Lançamentos: compras e saques")
+    c2.texto("Lançamentos: compras e saques")
+    c2.y = c1.y
+    for i in range(n_trans):
+        col = c1 if i % 2 == 0 else c2
+        if col.cheia():
+            col = c2 if col is c1 else c1
+            if col.cheia():
+                break
+        col.linha(*_transacao(rng))
+    if num % 3 == 1 and not c1.cheia():
+        c1.linha(f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}", "PAGAMENTO EFETUADO", "-" + _valor(rng))
+    if num % 2 == 0 and c2.y > 200:
+        c2.texto("Compras parceladas - próximas faturas")
+        for _ in range(3):
+            c2.linha(*_transacao(rng))
+        c2.texto("Total para próximas faturas")
+    if num % 4 == 2 and c2.y > 200:
+        c2.texto("Fique atento aos encargos para o próximo período (10/08 a 10/09)")
+        c2.linha("01/09", "Saque e crédito", "12,34")
+        c2.texto("Juros Máximos do contrato")
+    if (num % 3 == 0 or sem_cartao) and c1.y > 200:
+        c1.y = min(c1.y, c2.y)
+        c2.y = c1.y
+        c1.texto("Lançamentos internacionais")
+        c2.y = c1.y
+        for _ in range(2):
+            c1.linha(*_transacao(rng))
+            c1.texto(f"USD {rng.randint(1, 99)},00")
+        c1.texto("Dólar de Conversão R$ 5,20")
+        c1.texto(f"Repasse de IOF em R$ {rng.randint(1, 9)},{rng.randint(10, 99)}")
+        c1.texto("Total transações inter. em R$ 100,00")
+        c1.texto("Total lançamentos inter. em R$ 104,07")
+        if not sem_cartao:
+            c1.texto(f"Lançamentos no cartão (final {cartao})")
+    return c1.itens + c2.itens
+
+
+def _pagina_anexo(rng: random.Random, num: int) -> List[Texto]:
+    # páginas sem lançamento (limites, propaganda): o parser não tira nada delas
+    c1, c2 = _Coluna(X_COL1), _Coluna(X_COL2)
+    if num % 2 == 0:
+        c1.texto("Limites de crédito")
+        for nome in ("Limite total", "Limite disponível", "Limite para saques"):
+            c1.linha(nome, "", "R$ " + _valor(rng, 20000.0))
+        c2.texto("Encargos do próximo período")
+        c2.linha("Juros do rotativo", "", "14,90%")
+    else:
+        for _ in range(30):
+            c1.texto("Aproveite as ofertas exclusivas do seu cartão Itaú")
+            c2.texto("Consulte condições no app e no site")
+    return c1.itens + c2.itens
+
+
+def _esc(s: str) -> bytes:
+    b = s.encode("cp1252")
+    return b.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def gerar_fatura(n_paginas: int, trans_por_pagina: int = 40, seed: int = 0,
+                 cartoes: Tuple[str, ...] = ("1234", "5678", "9012"), anexos: int = 0,
+                 reemissao: int = 0, rotacao: int = 0, origem: Tuple[float, float] = (0.0, 0.0)) -> bytes:
+    """Gera o PDF (bytes) de uma fatura sintética com N páginas (+ `anexos` sem lançamentos).
+
+    Com `reemissao` > 0 só a primeira página muda (um rodapé "2ª via"), como numa
+    fatura reemitida; as demais saem idênticas às da mesma seed. `rotacao` grava
+    /Rotate em todas as páginas e `origem` desloca a MediaBox (e o conteúdo junto),
+    como em PDFs escaneados ou recortados.
+    """
+    rng = random.Random(seed)
+    objs: List[bytes] = []
+
+    def add(b: bytes) -> int:
+        objs.append(b)
+        return len(objs)
+
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    total = n_paginas + anexos
+    pages_id = len(objs) + 1 + 2 * total + 1
+    kids = []
+    for num in range(1, total + 1):
+        if num <= n_paginas:
+            itens = _pagina(rng, trans_por_pagina, list(cartoes), num)
+        else:
+            itens = _pagina_anexo(rng, num)
+        if num == 1 and reemissao:
+            itens.append((X_COL1, 40.0, f"2ª via emitida pelo app ({reemissao})"))
+        ops = [b"BT /F1 8 Tf"]
+        for x, y, s in itens:
+            ops.append(b"1 0 0 1 %.2f %.2f Tm (%s) Tj" % (x + origem[0], y + origem[1], _esc(s)))
+        ops.append(b"ET")
+        stream = b"\n".join(ops)
+        cont = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        ox, oy = origem
+        kids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [%g %g %g %g] %s/Contents %d 0 R "
+            b"/Resources << /Font << /F1 %d 0 R >> >> >>"
+            % (pages_id, ox, oy, ox + LARGURA, oy + ALTURA, b"/Rotate %d " % rotacao if rotacao else b"", cont, font)
+        ))
+    catalog = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+    add(b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % k for k in kids), len(kids)))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, o in enumerate(objs, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (i, o)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objs) + 1, catalog, xref)
+    return bytes(out)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Gera uma fatura Itaú sintética (PDF).")
+    ap.add_argument("-n", "--paginas", type=int, default=10)
+    ap.add_argument("-m", "--transacoes", type=int, default=40, help="lançamentos por página")
+    ap.add_argument("-s", "--seed", type=int, default=0)
+    ap.add_argument("-a", "--anexos", type=int, default=0, help="páginas extras sem lançamentos")
+    ap.add_argument("-r", "--reemissao", type=int, default=0, help="muda só a 1ª página (fatura reemitida)")
+    ap.add_argument("--rotacao", type=int, default=0, choices=[0, 90, 180, 270], help="/Rotate das páginas")
+    ap.add_argument("-o", "--saida", default="-", help="arquivo de saída (padrão: stdout)")
+    args = ap.parse_args()
+    pdf = gerar_fatura(args.paginas, args.transacoes, seed=args.seed, anexos=args.anexos, reemissao=args.reemissao,
+                       rotacao=args.rotacao)
+    if args.saida == "-":
+        sys.stdout.buffer.write(pdf)
+    else:
+        with open(args.saida, "wb") as f:
+            f.write(pdf)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Corpus de paridade: cada modo de execução otimizado contra a referência.
+
+A referência é processar_pdf serial com o backend pdfplumber. Cada modo (workers,
+streaming com Finalizador, pouca_memoria direto e pela camada de cache, caches
+por PDF e por página, frio e quente, outros backends) roda sobre o mesmo corpus
+(faturas sintéticas do gerar_fatura + PDFs passados na linha de comando) e a
+saída é comparada linha a linha com a da referência. Isso cobre quem sobrevive à stoplist de CP, ao
+_dedupe_iof e ao filtro de pagamentos. Na mesma rodada sai o tempo de cada modo
+(páginas/s e ganho sobre a referência).
+
+A própria referência é conferida com os CSVs esperados em benchmarks/golden/
+(outro diretório com --golden; --gravar grava/atualiza), para pegar mudança de
+comportamento do parser entre commits. A data das linhas de IOF (dia da
+exportação) é mascarada na comparação. PDF sem CSV esperado só gera aviso.
+
+Uso:
+    python benchmarks/paridade.py
+    python benchmarks/paridade.py faturas_anonimizadas/*.pdf --modos paralelo pdfium
+    python benchmarks/paridade.py --gravar        # depois de mudar o parser de propósito
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date
+from io import StringIO
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import pandas as pd  # noqa: E402
+
+import cache  # noqa: E402
+import parser as fatura  # noqa: E402
+from gerar_fatura import gerar_fatura  # noqa: E402
+
+# nome: (páginas com lançamentos, lançamentos por página, anexos, seed, reemissão)
+CORPUS = {
+    "curta": (2, 30, 0, 1, 0),
+    "anexos": (6, 40, 3, 2, 0),
+    "longa": (12, 50, 0, 3, 0),
+    "reemitida": (12, 50, 0, 3, 1),   # = "longa" com a 1ª página alterada (cache por página)
+    "densa": (4, 70, 1, 4, 0),
+}
+
+MASCARA_DATA = "DD/MM/AAAA"
+GOLDEN = Path(__file__).resolve().parent / "golden"
+LIMITE_RSS_MB = 4096  # só para passar pelo caminho que confere o RSS; não é para estourar
+
+
+def _modo_streaming(fonte, backend: str) -> pd.DataFrame:
+    fin = fatura.Finalizador()
+    for _ in fatura.iter_transacoes(fonte, fin, backend=backend):
+        pass
+    return fin.dataframe()
+
+
+def montar_modos(workers: int, diretorio: Path) -> Dict[str, Callable[[object], pd.DataFrame]]:
+    """nome -> função(fonte) -> DataFrame. Os caches usam diretórios novos em `diretorio`."""
+    cache_pdf = cache.CacheResultados(str(diretorio / "pdf"))
+    cache_pag = cache.CachePaginas(str(diretorio / "pag"))
+    modos = {
+        "paralelo": lambda f: fatura.processar_pdf(f, workers=workers),
+        "streaming": lambda f: _modo_streaming(f, "pdfplumber"),
+        "pouca_memoria": lambda f: fatura.processar_pdf(f, pouca_memoria=True),
+        # frio e depois quente: a 2ª rodada sai do cache
+        "cache_pdf": lambda f: cache.processar_pdf_cache(f, cache_pdf, por_pagina=False),
+        "cache_pdf_quente": lambda f: cache.processar_pdf_cache(f, cache_pdf, por_pagina=False),
+        "cache_paginas": lambda f: cache.processar_pdf_paginas(f, cache_pag),
+        "cache_paginas_quente": lambda f: cache.processar_pdf_paginas(f, cache_pag),
+        # pouca memória pela camada de cache (o caminho do app, do lote e da fila)
+        "cache_pouca_memoria": lambda f: cache.processar_pdf_cache(
+            f, cache.CacheResultados(str(diretorio / "pm")), pouca_memoria=True, limite_rss_mb=LIMITE_RSS_MB),
+        "cache_pouca_memoria_pdf": lambda f: cache.processar_pdf_cache(
+            f, cache.CacheResultados(str(diretorio / "pm_pdf")), por_pagina=False, pouca_memoria=True,
+            limite_rss_mb=LIMITE_RSS_MB),
+    }
+    for backend in fatura.BACKENDS:
+        if backend != "pdfplumber":
+            modos[backend] = lambda f, b=backend: fatura.processar_pdf(f, backend=b)
+            modos[f"{backend}_paralelo"] = lambda f, b=backend: fatura.processar_pdf(f, workers=workers, backend=b)
+    return modos
+
+
+def carregar_corpus(arquivos: List[str]) -> List[Tuple[str, bytes, int]]:
+    """[(nome, bytes do PDF, páginas)]."""
+    itens = []
+    for nome, (n, m, anexos, seed, reemissao) in CORPUS.items():
+        itens.append((nome, gerar_fatura(n, m, seed=seed, anexos=anexos, reemissao=reemissao), n + anexos))
+    for arq in arquivos:
+        dados = Path(arq).read_bytes()
+        with fatura.abrir_documento(dados, sondar=False) as doc:
+            itens.append((Path(arq).name, dados, len(doc)))
+    return itens
+
+
+def como_texto(df: pd.DataFrame) -> pd.DataFrame:
+    """Tudo como texto, igual ao CSV exportado; a data do dia (IOF) vira máscara."""
+    txt = pd.read_csv(StringIO(df.to_csv(index=False)), dtype=str, keep_default_na=False)
+    txt.loc[txt["Data"] == date.today().strftime("%d/%m/%Y"), "Data"] = MASCARA_DATA
+    return txt
+
+
+def diferencas(ref: pd.DataFrame, df: pd.DataFrame, limite: int = 5) -> List[str]:
+    """Diferenças linha a linha (vazia = idênticos, inclusive na ordem)."""
+    a, b = como_texto(ref), como_texto(df)
+    if list(a.columns) != list(b.columns):
+        return [f"colunas: {list(a.columns)} != {list(b.columns)}"]
+    linhas_a = list(a.itertuples(index=False, name=None))
+    linhas_b = list(b.itertuples(index=False, name=None))
+    if linhas_a == linhas_b:
+        return []
+    ca, cb = Counter(linhas_a), Counter(linhas_b)
+    so_ref, so_modo = list((ca - cb).elements()), list((cb - ca).elements())
+    saida = [f"{len(linhas_a)} linhas na referência, {len(linhas_b)} no modo"]
+    saida += [f"  só na referência: {r}" for r in so_ref[:limite]]
+    saida += [f"  só no modo:       {r}" for r in so_modo[:limite]]
+    if not so_ref and not so_modo:
+        i = next(i for i, (x, y) in enumerate(zip(linhas_a, linhas_b)) if x != y)
+        saida.append(f"  mesmas linhas, ordem diferente a partir da linha {i}: {linhas_a[i]} != {linhas_b[i]}")
+    return saida
+
+
+def _cronometrar(func: Callable[[], pd.DataFrame]) -> Tuple[Optional[pd.DataFrame], float, Optional[str]]:
+    t0 = time.perf_counter()
+    try:
+        df = func()
+    except ImportError as e:  # backend opcional ausente
+        return None, 0.0, f"indisponível ({e})"
+    return df, time.perf_counter() - t0, None
+
+
+def conferir_golden(nome: str, ref: pd.DataFrame, golden: Path, gravar: bool) -> Optional[List[str]]:
+    """Diferenças para o CSV esperado; None se ainda não houver um."""
+    arq = golden / f"{nome}.csv"
+    if gravar:
+        golden.mkdir(parents=True, exist_ok=True)
+        como_texto(ref).to_csv(arq, index=False)
+        return []
+    if not arq.exists():
+        return None
+    gravado = pd.read_csv(arq, dtype=str, keep_default_na=False)
+    return diferencas(_mascaradas_no_fim(gravado), _mascaradas_no_fim(como_texto(ref)))
+
+
+def _mascaradas_no_fim(txt: pd.DataFrame) -> pd.DataFrame:
+    # a linha de IOF ordena pela data do dia, que muda a cada rodada: a posição
+    # dela não entra na comparação com o golden (o conteúdo entra)
+    mascarada = txt["Data"] == MASCARA_DATA
+    return pd.concat([txt[~mascarada], txt[mascarada]], ignore_index=True)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Paridade e vazão de cada modo de execução contra a referência.")
+    ap.add_argument("arquivos", nargs="*", help="PDFs extras (anonimizados) além do corpus sintético")
+    ap.add_argument("--modos", nargs="+", help="só estes modos (padrão: todos)")
+    ap.add_argument("-j", "--workers", type=int, default=2, help="workers dos modos paralelos")
+    ap.add_argument("--golden", type=Path, default=GOLDEN, help="diretório com os CSVs esperados da referência")
+    ap.add_argument("--gravar", action="store_true", help="grava/atualiza os CSVs do --golden")
+    ap.add_argument("--json", type=Path, help="grava o relatório (paridade + tempos) em JSON")
+    args = ap.parse_args()
+
+    corpus = carregar_corpus(args.arquivos)
+    total_paginas = sum(p for _, _, p in corpus)
+    falhas = 0
+    relatorio: Dict[str, Dict] = {}
+    with tempfile.TemporaryDirectory() as d:
+        modos = montar_modos(args.workers, Path(d))
+        if args.modos:
+            desconhecidos = set(args.modos) - set(modos)
+            if desconhecidos:
+                ap.error(f"modos desconhecidos: {', '.join(sorted(desconhecidos))} (opções: {', '.join(modos)})")
+            modos = {n: f for n, f in modos.items() if n in args.modos}
+        tempos = {"referencia": 0.0, **{n: 0.0 for n in modos}}
+        divergencias = {n: 0 for n in tempos}
+        indisponiveis: Dict[str, str] = {}
+
+        for nome, dados, n_paginas in corpus:
+            ref, seg, _ = _cronometrar(lambda: fatura.processar_pdf(dados))
+            tempos["referencia"] += seg
+            print(f"{nome}: {n_paginas} páginas, {len(ref)} linhas (referência {seg * 1000:.0f} ms)")
+            difs = conferir_golden(nome, ref, args.golden, args.gravar)
+            if difs is None:
+                print(f"  {'golden':<24} sem CSV esperado (use --gravar)")
+            else:
+                divergencias["referencia"] += bool(difs)
+                print(f"  {'golden':<24} {'ok' if not difs else 'DIFERENTE'}")
+                for ln in difs:
+                    print(f"      {ln}")
+            for modo, func in modos.items():
+                if modo in indisponiveis:
+                    continue
+                df, seg, erro = _cronometrar(lambda: func(dados))
+                if erro:
+                    indisponiveis[modo] = erro
+                    print(f"  {modo:<24} {erro}")
+                    continue
+                tempos[modo] += seg
+                difs = diferencas(ref, df)
+                divergencias[modo] += bool(difs)
+                print(f"  {modo:<24} {'ok' if not difs else 'DIFERENTE'}  {seg * 1000:8.0f} ms")
+                for ln in difs:
+                    print(f"      {ln}")
+
+    print(f"\n{'modo':<24} {'faturas ok':>10} {'total s':>8} {'pág/s':>8} {'ganho':>7}")
+    for modo, seg in tempos.items():
+        if modo in indisponiveis:
+            continue
+        ok = len(corpus) - divergencias[modo]
+        ganho = tempos["referencia"] / seg if seg else float("nan")
+        print(f"{modo:<24} {ok:>5}/{len(corpus):<4} {seg:8.2f} {total_paginas / seg if seg else 0:8.1f} {ganho:6.1f}x")
+        relatorio[modo] = {"faturas": len(corpus), "divergentes": divergencias[modo], "segundos": seg,
+                           "paginas_por_s": total_paginas / seg if seg else None, "ganho": ganho if seg else None}
+        falhas += divergencias[modo]
+
+    if args.json:
+        args.json.write_text(json.dumps({"paginas": total_paginas, "modos": relatorio,
+                                         "indisponiveis": indisponiveis}, indent=2, ensure_ascii=False))
+    if falhas:
+        print(f"\n{falhas} divergência(s)")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Paridade entre backends de extração (parser.BACKENDS).
+
+Roda processar_pdf com cada backend sobre as faturas dos cenários do benchmark
+(e sobre PDFs passados na linha de comando) e exige DataFrames idênticos ao do
+backend de referência (pdfplumber). Imprime também o tempo de cada backend.
+
+Uso:
+    python benchmarks/paridade_backends.py
+    python benchmarks/paridade_backends.py faturas/*.pdf
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import pandas as pd  # noqa: E402
+
+import parser as fatura  # noqa: E402
+from bench_parser import CENARIOS  # noqa: E402
+from gerar_fatura import gerar_fatura  # noqa: E402
+
+REFERENCIA = "pdfplumber"
+
+# páginas que o pdfium não extrai direto (vão para o pdfplumber): nome -> kwargs do gerar_fatura
+GEOMETRIAS = {
+    "rotacionada_90": {"rotacao": 90},
+    "rotacionada_180": {"rotacao": 180},
+    "origem_deslocada": {"origem": (-20.0, 10.0)},
+}
+
+
+def fixtures(arquivos: List[str]) -> List[Tuple[str, object]]:
+    itens: List[Tuple[str, object]] = []
+    for nome, (n_paginas, por_pagina, anexos) in CENARIOS.items():
+        itens.append((nome, gerar_fatura(n_paginas, por_pagina, seed=n_paginas, anexos=anexos)))
+    for nome, kwargs in GEOMETRIAS.items():
+        itens.append((nome, gerar_fatura(4, 40, seed=4, anexos=1, **kwargs)))
+    itens.extend((a, a) for a in arquivos)
+    return itens
+
+
+def primeira_diferenca(ref: pd.DataFrame, df: pd.DataFrame) -> str:
+    if len(ref) != len(df):
+        return f"{len(ref)} linhas na referência, {len(df)} no backend"
+    for i, (a, b) in enumerate(zip(ref.itertuples(index=False), df.itertuples(index=False))):
+        if a != b:
+            return f"linha {i}: {tuple(a)} != {tuple(b)}"
+    return "tipos de coluna diferentes"
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Confere se todos os backends geram o mesmo DataFrame.")
+    ap.add_argument("arquivos", nargs="*", help="PDFs extras além das faturas sintéticas")
+    ap.add_argument("--backends", nargs="+", choices=sorted(fatura.BACKENDS), default=sorted(fatura.BACKENDS))
+    args = ap.parse_args()
+
+    falhas = 0
+    tempos: Dict[str, float] = {b: 0.0 for b in args.backends}
+    for nome, fonte in fixtures(args.arquivos):
+        ref = None
+        for backend in [REFERENCIA] + [b for b in args.backends if b != REFERENCIA]:
+            t0 = time.perf_counter()
+            try:
+                df = fatura.processar_pdf(fonte, backend=backend)
+            except ImportError as e:
+                print(f"  {backend:<10} indisponível ({e})")
+                continue
+            seg = time.perf_counter() - t0
+            tempos[backend] = tempos.get(backend, 0.0) + seg
+            if ref is None:
+                ref = df
+                print(f"{nome}: {len(df)} linhas ({backend} {seg * 1000:.0f} ms)")
+                continue
+            if df.equals(ref):
+                print(f"  {backend:<10} ok   {seg * 1000:8.0f} ms")
+            else:
+                falhas += 1
+                print(f"  {backend:<10} DIFERENTE: {primeira_diferenca(ref, df)}")
+
+    print()
+    for backend, seg in tempos.items():
+        if seg:
+            print(f"{backend:<10} {seg:7.2f}s  ({tempos[REFERENCIA] / seg:.1f}x a referência)")
+    if falhas:
+        print(f"\n{falhas} divergência(s) entre backends")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Conferência da exportação (exportacao.py) pelos caminhos que geram arquivo.
+
+- CSV/TSV em blocos saem byte a byte iguais ao DataFrame.to_csv;
+- Parquet/Arrow do lote (competência pelo nome do arquivo e por --competencia) e
+  do para_buffer do app trazem a coluna "data" preenchida em todas as linhas e
+  igual à data_completa de cada "dd/mm".
+
+Precisa do pyarrow. Sai com 1 se algo divergir.
+
+Uso:
+    python benchmarks/paridade_exportacao.py
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+from typing import List
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import pandas as pd  # noqa: E402
+
+import exportacao  # noqa: E402
+import lote  # noqa: E402
+import parser as fatura  # noqa: E402
+from gerar_fatura import gerar_fatura  # noqa: E402
+
+COMPETENCIA = "2025-03"
+
+
+def conferir_datas(nome: str, tabela, df: pd.DataFrame, competencia: str) -> List[str]:
+    datas = tabela.column("data").to_pylist()
+    nulas = sum(d is None for d in datas)
+    if nulas:
+        return [f"{nome}: {nulas} de {len(datas)} linhas com data nula"]
+    esperadas = [fatura.data_completa(d, competencia) for d in df["Data"]]
+    if datas != esperadas:
+        i = next(i for i, (a, b) in enumerate(zip(datas, esperadas)) if a != b)
+        return [f"{nome}: linha {i}: data {datas[i]} != {esperadas[i]}"]
+    return []
+
+
+def main() -> int:
+    if not exportacao.tem_pyarrow():
+        print("precisa do pyarrow", file=sys.stderr)
+        return 2
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+
+    pdf = gerar_fatura(4, 40, seed=4, anexos=1)
+    df = fatura.processar_pdf(pdf)
+    falhas: List[str] = []
+
+    for sep, formato in ((",", "csv"), ("\t", "tsv")):
+        buf = exportacao.para_buffer(df, formato).getvalue()
+        if buf != df.to_csv(index=False, sep=sep).encode(exportacao.CSV_ENCODING):
+            falhas.append(f"{formato}: diferente do DataFrame.to_csv")
+
+    with tempfile.TemporaryDirectory() as d:
+        pelo_nome = Path(d, f"fatura_{COMPETENCIA}.pdf")
+        sem_nome = Path(d, "fatura.pdf")
+        pelo_nome.write_bytes(pdf)
+        sem_nome.write_bytes(pdf)
+        saida = Path(d, "saida")
+        if lote.main([str(pelo_nome), "-o", str(saida), "-j", "1", "--formato", "parquet"]) != 0:
+            falhas.append("lote (competência do nome) falhou")
+        else:
+            falhas += conferir_datas("lote, nome", pq.read_table(saida / pelo_nome.with_suffix(".parquet").name),
+                                     df, COMPETENCIA)
+        if lote.main([str(sem_nome), "-o", str(saida), "-j", "1", "--formato", "arrow",
+                      "--competencia", COMPETENCIA]) != 0:
+            falhas.append("lote (--competencia) falhou")
+        else:
+            falhas += conferir_datas("lote, --competencia", feather.read_table(saida / "fatura.arrow"),
+                                     df, COMPETENCIA)
+
+    falhas += conferir_datas("para_buffer", pq.read_table(exportacao.para_buffer(df, "parquet", COMPETENCIA)),
+                             df, COMPETENCIA)
+
+    for ln in falhas:
+        print(f"DIFERENTE  {ln}")
+    print(f"{len(df)} linhas; {'ok' if not falhas else f'{len(falhas)} divergência(s)'}")
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
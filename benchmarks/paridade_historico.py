@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Conferência do histórico (historico.py) contra o parser.
+
+Importa uma fatura sintética num SQLite temporário e confere:
+
+- o livro-razão tem os mesmos lançamentos que processar_pdf devolve;
+- um cartão que continua na página seguinte (a página 5 do gerar_fatura não tem
+  cabeçalho de cartão) fica com os lançamentos das duas páginas: nenhum
+  lançamento com cartão NULL e consultar(cartao=...) traz os da continuação;
+- reimportar o mesmo PDF não grava nada.
+
+Sai com 1 se algo divergir.
+
+Uso:
+    python benchmarks/paridade_historico.py
+"""
+
+import sys
+from pathlib import Path
+from typing import List
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import historico  # noqa: E402
+import parser as fatura  # noqa: E402
+from gerar_fatura import gerar_fatura  # noqa: E402
+
+COMPETENCIA = "2025-05"
+CARTAO_PAGINA_4 = "1234"  # gerar_fatura: cartões em rodízio, página 4 -> 1º cartão; a 5 continua a 4
+
+
+def main() -> int:
+    pdf = gerar_fatura(6, 40, seed=6)
+    df = fatura.processar_pdf(pdf)
+    falhas: List[str] = []
+
+    with historico.Historico(":memory:") as h:
+        resumo = h.importar_pdf(pdf, COMPETENCIA)
+        linhas = list(h.consultar())
+        if resumo["linhas"] + resumo["duplicadas"] + resumo["descartadas_cp"] != len(df):
+            falhas.append(f"{len(df)} linhas no parser, resumo da importação {resumo}")
+
+        sem_cartao = [r["chave"] for r in linhas
+                      if r["cartao"] is None and not r["estabelecimento"].startswith("Repasse de IOF")]
+        if sem_cartao:
+            falhas.append(f"{len(sem_cartao)} lançamentos com cartão NULL (ex.: {sem_cartao[:3]})")
+
+        chaves_cartao = {r["chave"] for r in h.consultar(cartao=CARTAO_PAGINA_4)}
+        pagina_5 = [r[0] for r in h.conn.execute("SELECT chave FROM lancamentos WHERE pagina = 5")]
+        fora = [c for c in pagina_5 if c not in chaves_cartao]
+        if not pagina_5 or fora:
+            falhas.append(f"página 5: {len(pagina_5)} lançamentos, {len(fora)} fora de "
+                          f"consultar(cartao={CARTAO_PAGINA_4!r})")
+
+        if not h.importar_pdf(pdf, COMPETENCIA)["ignorada"]:
+            falhas.append("reimportar o mesmo PDF não foi ignorado")
+
+    for ln in falhas:
+        print(f"DIFERENTE  {ln}")
+    print(f"{len(df)} linhas; {'ok' if not falhas else f'{len(falhas)} divergência(s)'}")
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Orçamento de tempo de import (python -X importtime) dos módulos do projeto.
+
+Para cada módulo, importa num processo limpo, lê a árvore do -X importtime e
+confere duas coisas:
+  - nenhum dos módulos pesados (pandas, pdfplumber, ...) entrou no import;
+  - o tempo acumulado do módulo (melhor de -r rodadas) cabe no orçamento.
+Sai com código 1 se algum módulo estourar.
+
+Uso:
+    python benchmarks/tempo_import.py
+    python benchmarks/tempo_import.py -r 7 --fator 1.5     # orçamento 50% mais folgado
+"""
+
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+from typing import Set, Tuple
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+# módulo -> tempo máximo (ms) do import acumulado
+ORCAMENTO_MS = {
+    "parser": 60.0,
+    "cache": 80.0,
+    "exportacao": 80.0,
+    "historico": 100.0,
+    "lote": 150.0,
+    "servidor": 150.0,
+    "tarefas": 100.0,
+}
+
+# não podem ser importados só por importar os módulos acima
+PESADOS = ["pandas", "numpy", "pdfplumber", "pdfminer", "PIL", "pypdfium2", "pyarrow", "streamlit"]
+
+
+def medir(modulo: str) -> Tuple[float, Set[str]]:
+    """(ms acumulados do import de `modulo`, nomes de todos os módulos importados)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        cwd=RAIZ, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {modulo} falhou:\n{proc.stderr[-2000:]}")
+    total_us, nomes = None, set()
+    for ln in proc.stderr.splitlines():
+        # "import time:   self [us] | cumulative | imported package"
+        if not ln.startswith("import time:") or "cumulative" in ln:
+            continue
+        _, acumulado, nome = ln[len("import time:"):].split("|")
+        nomes.add(nome.strip())
+        if nome.rstrip() == f" {modulo}":
+            total_us = int(acumulado)
+    if total_us is None:
+        raise RuntimeError(f"{modulo} não apareceu no -X importtime (já estava importado?)")
+    return total_us / 1000, nomes
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Confere o orçamento de tempo de import.")
+    ap.add_argument("modulos", nargs="*", default=sorted(ORCAMENTO_MS))
+    ap.add_argument("-r", "--repeticoes", type=int, default=5)
+    ap.add_argument("--fator", type=float, default=1.0, help="multiplica o orçamento (máquinas lentas/CI)")
+    args = ap.parse_args()
+
+    falhas = []
+    for modulo in args.modulos:
+        medidas = [medir(modulo) for _ in range(args.repeticoes)]
+        ms = min(m for m, _ in medidas)
+        nomes = medidas[0][1]
+        pesados = sorted(p for p in PESADOS if any(n == p or n.startswith(p + ".") for n in nomes))
+        limite = ORCAMENTO_MS.get(modulo, 100.0) * args.fator
+        marca = ""
+        if ms > limite:
+            marca = "  <-- ESTOUROU"
+            falhas.append(f"{modulo}: {ms:.1f} ms > {limite:.0f} ms")
+        if pesados:
+            marca += "  <-- IMPORTA " + ", ".join(pesados)
+            falhas.append(f"{modulo}: importa {', '.join(pesados)}")
+        print(f"{modulo:<10} {ms:7.1f} ms  (orçamento {limite:.0f} ms, {len(nomes)} módulos){marca}")
+
+    if falhas:
+        print("\n" + "\n".join(falhas))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
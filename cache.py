@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache de resultados do parser, por conteúdo do PDF e por página.
+
+A chave é o SHA-256 dos bytes do PDF + a impressão digital do parser (conjunto de
+regex RX_* do parser.py) + a data de exportação (as linhas de IOF levam a data do dia).
+O DataFrame final fica em disco em Parquet (se houver pyarrow) ou pickle, com
+despejo LRU quando o diretório passa do limite de tamanho.
+
+Quando o PDF inteiro não está no cache, o cache por página (CachePaginas) ainda
+evita reextrair as páginas que já foram vistas: a chave é o hash do conteúdo da
+página (content streams, recursos, caixas), então uma fatura reemitida com só o
+resumo alterado, ou páginas de avisos iguais em várias faturas, reaproveitam a
+extração e as passadas. IOF, stoplist de CP e dedupe rodam sempre sobre o PDF todo.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import pickle
+import re
+from datetime import date
+from io import BytesIO
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+from exportacao import tem_pyarrow
+import parser as _parser
+from parser import (
+    SEM_ESTATISTICAS, EstatisticasParser, Finalizador, FontePDF, ResultadoPagina,
+    Transacao, _abrir_medindo, _abrir_pdf, _conferir_memoria, _extrair_medindo, processar_pagina, processar_pdf,
+)
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Aumente quando mudar a lógica do parser sem mexer nas regex.
+VERSAO_CACHE = 2
+# Aumente quando mudar a extração (PaginaExtraida) de algum backend.
+VERSAO_PAGINAS = 2
+
+# progresso(páginas prontas, total de páginas)
+Progresso = Callable[[int, int], None]
+
+LIMITE_PADRAO = 256 * 1024 * 1024  # 256 MB
+
+
+def impressao_parser() -> str:
+    """Hash das regex RX_* do parser.py; muda sempre que um padrão ou flag muda."""
+    h = hashlib.sha256(f"v{VERSAO_CACHE}".encode())
+    for nome in sorted(n for n in vars(_parser) if n.startswith("RX_")):
+        valor = getattr(_parser, nome)
+        for rx in (valor if isinstance(valor, list) else [valor]):
+            if isinstance(rx, re.Pattern):
+                h.update(f"{nome}\0{rx.pattern}\0{rx.flags}\n".encode())
+    return h.hexdigest()[:16]
+
+
+class CacheResultados:
+    """Cache em disco (LRU por tamanho) de DataFrames já processados."""
+
+    def __init__(self, diretorio: Optional[str] = None, limite_bytes: int = LIMITE_PADRAO):
+        self.diretorio = Path(
+            diretorio or os.environ.get("FATURA_CACHE_DIR") or Path.home() / ".cache" / "fatura-itau"
+        )
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        self.limite_bytes = limite_bytes
+        self.ext = ".parquet" if tem_pyarrow() else ".pkl"
+        self._impressao = impressao_parser()
+
+    def chave(self, dados) -> str:
+        # qualquer objeto com buffer protocol (bytes, memoryview, mmap)
+        return self.chave_sha256(hashlib.sha256(dados).hexdigest())
+
+    def chave_sha256(self, sha256: str) -> str:
+        return f"{sha256}-{self._impressao}-{date.today():%Y%m%d}"
+
+    def _caminho(self, chave: str) -> Path:
+        return self.diretorio / (chave + self.ext)
+
+    def obter(self, chave: str) -> Optional[pd.DataFrame]:
+        import pandas as pd
+
+        arq = self._caminho(chave)
+        try:
+            df = pd.read_parquet(arq) if self.ext == ".parquet" else pd.read_pickle(arq)
+        except Exception:  # ausente ou corrompido: trata como miss
+            return None
+        try:
+            os.utime(arq)  # marca como usado recentemente (LRU)
+        except OSError:
+            pass
+        return df
+
+    def guardar(self, chave: str, df: pd.DataFrame) -> None:
+        arq = self._caminho(chave)
+        tmp = arq.with_name(arq.name + f".{os.getpid()}.tmp")
+        if self.ext == ".parquet":
+            df.to_parquet(tmp, index=False)
+        else:
+            df.to_pickle(tmp)
+        os.replace(tmp, arq)
+        self._despejar()
+
+    def _despejar(self) -> None:
+        arquivos: List[Tuple[float, int, Path]] = []
+        for arq in self.diretorio.glob("*" + self.ext):
+            try:
+                st = arq.stat()
+            except OSError:
+                continue
+            arquivos.append((st.st_mtime, st.st_size, arq))
+        total = sum(tam for _, tam, _ in arquivos)
+        for _, tam, arq in sorted(arquivos):
+            if total <= self.limite_bytes:
+                break
+            try:
+                arq.unlink()
+            except OSError:
+                continue
+            total -= tam
+
+    def limpar(self) -> None:
+        for arq in self.diretorio.glob("*" + self.ext):
+            arq.unlink(missing_ok=True)
+
+
+_cache_padrao: Optional[CacheResultados] = None
+
+
+def cache_padrao() -> CacheResultados:
+    global _cache_padrao
+    if _cache_padrao is None:
+        _cache_padrao = CacheResultados()
+    return _cache_padrao
+
+
+def _bytes_para_hash(fonte: FontePDF):
+    # devolve algo com buffer protocol para o hashlib, sem copiar quando dá
+    if isinstance(fonte, (str, os.PathLike)):
+        with open(fonte, "rb") as f:
+            return f.read()
+    if isinstance(fonte, BytesIO):
+        return fonte.getbuffer()
+    if isinstance(fonte, (bytes, bytearray, memoryview, mmap.mmap)):
+        return fonte
+    pos = fonte.tell()
+    fonte.seek(0)
+    dados = fonte.read()
+    fonte.seek(pos)
+    return dados
+
+
+def sha256_fonte(fonte: FontePDF) -> str:
+    """SHA-256 (hex) dos bytes do PDF, sem copiar quando dá."""
+    buf = _bytes_para_hash(fonte)
+    try:
+        return hashlib.sha256(buf).hexdigest()
+    finally:
+        # só a view criada aqui (BytesIO.getbuffer); a do chamador continua dele
+        if buf is not fonte and isinstance(buf, memoryview):
+            buf.release()  # libera o BytesIO para redimensionar/fechar
+
+
+# ---------------- cache por página ----------------
+class CachePaginas(CacheResultados):
+    """Mesmo armazenamento LRU, num subdiretório, guardando objetos picklados.
+
+    Por página ficam duas entradas: a PaginaExtraida (chave = conteúdo da página +
+    backend) e o ResultadoPagina das passadas (mesma chave + impressão do parser),
+    para que mudar uma regex não jogue fora a extração, que é a parte cara.
+    """
+
+    def __init__(self, diretorio: Optional[str] = None, limite_bytes: int = LIMITE_PADRAO):
+        base = Path(diretorio or os.environ.get("FATURA_CACHE_DIR") or Path.home() / ".cache" / "fatura-itau")
+        super().__init__(str(base / "paginas"), limite_bytes)
+        self.ext = ".pkl"
+
+    def chave(self, impressao: str, backend: str) -> str:
+        return f"{impressao}-{backend}-p{VERSAO_PAGINAS}"
+
+    def chave_resultado(self, chave: str) -> str:
+        return f"{chave}-{self._impressao}"
+
+    def obter(self, chave: str):
+        arq = self._caminho(chave)
+        try:
+            with open(arq, "rb") as f:
+                obj = pickle.load(f)
+        except Exception:  # ausente ou corrompido: trata como miss
+            return None
+        try:
+            os.utime(arq)
+        except OSError:
+            pass
+        return obj
+
+    def guardar(self, chave: str, obj) -> None:
+        arq = self._caminho(chave)
+        tmp = arq.with_name(arq.name + f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, arq)
+
+    def despejar(self) -> None:
+        # uma vez por PDF, não a cada página gravada
+        self._despejar()
+
+
+_cache_paginas_padrao: Optional[CachePaginas] = None
+
+
+def cache_paginas_padrao() -> CachePaginas:
+    global _cache_paginas_padrao
+    if _cache_paginas_padrao is None:
+        _cache_paginas_padrao = CachePaginas()
+    return _cache_paginas_padrao
+
+
+_caches_paginas: Dict[Path, CachePaginas] = {}
+
+
+def cache_paginas_de(cache: CacheResultados) -> CachePaginas:
+    """O cache por página que fica junto de `cache` (<diretório>/paginas)."""
+    paginas = _caches_paginas.get(cache.diretorio)
+    if paginas is None:
+        paginas = _caches_paginas[cache.diretorio] = CachePaginas(str(cache.diretorio), cache.limite_bytes)
+    return paginas
+
+
+# dizem só como o stream está codificado; o hash usa os dados já decodificados
+ATRIBUTOS_COMPRESSAO = {"Length", "Filter", "DecodeParms", "DL"}
+
+
+def _hash_pdf(obj, memo: Dict[int, bytes]) -> bytes:
+    """Hash estável de um objeto do pdfminer, seguindo referências (cada uma uma vez)."""
+    from pdfminer.pdftypes import PDFObjRef, PDFStream
+
+    if isinstance(obj, PDFObjRef):
+        objid = obj.objid
+        if objid not in memo:
+            memo[objid] = b"ciclo"  # referência circular: não desce de novo
+            memo[objid] = _hash_pdf(obj.resolve(), memo)
+        return memo[objid]
+    h = hashlib.sha256()
+    if isinstance(obj, PDFStream):
+        try:
+            dados = obj.get_data()  # conteúdo decodificado: não depende da compressão
+            attrs = {k: v for k, v in obj.attrs.items() if k not in ATRIBUTOS_COMPRESSAO}
+        except Exception:
+            dados, attrs = obj.get_rawdata() or b"", obj.attrs
+        h.update(b"S" + _hash_pdf(attrs, memo) + dados)
+    elif isinstance(obj, dict):
+        h.update(b"D")
+        for k in sorted(obj, key=str):
+            h.update(str(k).encode() + b"\0" + _hash_pdf(obj[k], memo))
+    elif isinstance(obj, (list, tuple)):
+        h.update(b"L")
+        for v in obj:
+            h.update(_hash_pdf(v, memo))
+    else:
+        h.update(repr(obj).encode())
+    return h.digest()
+
+
+# o que muda o que a extração enxerga; /Parent fica de fora (é a árvore inteira)
+ATRIBUTOS_PAGINA = ("Contents", "Resources", "MediaBox", "CropBox", "Rotate")
+
+
+def impressoes_paginas(fonte: FontePDF) -> List[str]:
+    """Hash do conteúdo de cada página, na ordem do PDF.
+
+    Cobre os content streams e tudo o que eles usam (fontes e ToUnicode, Form
+    XObjects, imagens), além de mediabox/cropbox/rotação. Objetos compartilhados
+    entre páginas são hasheados uma vez só.
+    """
+    memo: Dict[int, bytes] = {}
+    with _abrir_pdf(fonte) as pdf:
+        impressoes = []
+        for page in pdf.pages:
+            attrs = page.page_obj.attrs
+            h = hashlib.sha256()
+            for nome in ATRIBUTOS_PAGINA:
+                h.update(nome.encode() + _hash_pdf(attrs.get(nome), memo))
+            impressoes.append(h.hexdigest())
+    return impressoes
+
+
+def _na_pagina(res: ResultadoPagina, page_idx: int) -> ResultadoPagina:
+    # a mesma página pode estar em outra posição (ou em outro PDF)
+    def _mover(ts: List[Transacao]) -> List[Transacao]:
+        return [t if t.pagina == page_idx else
+                Transacao(t.data, t.estabelecimento, t.centavos, t.passada, page_idx, t.coluna, t.cartao)
+                for t in ts]
+    return res._replace(passada_1=_mover(res.passada_1), passada_2=_mover(res.passada_2))
+
+
+def processar_pdf_paginas(
+    fonte: FontePDF, cache: Optional[CachePaginas] = None, stats: Optional[EstatisticasParser] = None,
+    backend: str = "pdfplumber", progresso: Optional[Progresso] = None,
+    pouca_memoria: bool = False, limite_rss_mb: Optional[float] = None,
+) -> pd.DataFrame:
+    """processar_pdf reaproveitando páginas já vistas (CachePaginas).
+
+    Só as páginas novas ou alteradas são extraídas e passam pelas três passadas;
+    o Finalizador roda sobre todas, em ordem, então a saída é a de processar_pdf.
+    progresso, se dado, é chamado a cada página pronta (as do cache contam de uma vez).
+
+    Aqui a extração já é página a página, como no pouca_memoria do processar_pdf
+    (o parâmetro é aceito pela mesma interface); limite_rss_mb confere o RSS a
+    cada página extraída e no fim, e levanta LimiteMemoriaExcedido se não baixar.
+    """
+    cache = cache or cache_paginas_padrao()
+    stats = stats or SEM_ESTATISTICAS
+    with stats.medir("impressoes"):
+        chaves = [cache.chave(imp, backend) for imp in impressoes_paginas(fonte)]
+
+    resultados: List[Optional[ResultadoPagina]] = [None] * len(chaves)
+    faltando: List[int] = []
+    for i, chave in enumerate(chaves):
+        res = cache.obter(cache.chave_resultado(chave))
+        if res is None:
+            faltando.append(i)
+        else:
+            resultados[i] = _na_pagina(res, i + 1)
+    stats.contar("paginas_cache", len(chaves) - len(faltando))
+    if progresso is not None:
+        progresso(len(chaves) - len(faltando), len(chaves))
+
+    if faltando:
+        doc = None
+        try:
+            for feitas, i in enumerate(faltando, start=len(chaves) - len(faltando) + 1):
+                chave = chaves[i]
+                pag = cache.obter(chave)
+                if pag is None:
+                    if doc is None:
+                        doc = _abrir_medindo(fonte, backend, stats)
+                    pag = _extrair_medindo(doc, i + 1, stats)
+                    cache.guardar(chave, pag)
+                res = processar_pagina(pag, i + 1, stats)
+                del pag
+                cache.guardar(cache.chave_resultado(chave), res)
+                resultados[i] = res
+                _conferir_memoria(limite_rss_mb, i + 1, stats)
+                if progresso is not None:
+                    progresso(feitas, len(chaves))
+        finally:
+            if doc is not None:
+                doc.close()
+        cache.despejar()
+
+    fin = Finalizador(stats)
+    for res in resultados:
+        fin.adicionar(res)
+    df = fin.dataframe()
+    _conferir_memoria(limite_rss_mb, len(chaves), stats)
+    return df
+
+
+def processar_pdf_cache(
+    fonte: FontePDF, cache: Optional[CacheResultados] = None, por_pagina: bool = True,
+    progresso: Optional[Progresso] = None, cache_paginas: Optional[CachePaginas] = None, **kwargs
+) -> pd.DataFrame:
+    """Igual a processar_pdf, mas devolve do cache quando o mesmo PDF já foi processado.
+
+    Num miss, com por_pagina (e sem workers > 1), processa via processar_pdf_paginas
+    e reaproveita as páginas que já estavam no cache por página; pouca_memoria e
+    limite_rss_mb valem nos dois caminhos. progresso só é chamado no por página.
+    O cache por página é cache_paginas ou, sem ele, o subdiretório "paginas" do
+    diretório de `cache`.
+    """
+    cache = cache or cache_padrao()
+    chave = cache.chave_sha256(sha256_fonte(fonte))
+    df = cache.obter(chave)
+    if df is None:
+        if por_pagina and kwargs.get("workers", 1) <= 1:
+            kwargs.pop("workers", None)
+            df = processar_pdf_paginas(fonte, cache_paginas or cache_paginas_de(cache), progresso=progresso, **kwargs)
+        else:
+            df = processar_pdf(fonte, **kwargs)
+        cache.guardar(chave, df)
+    return df
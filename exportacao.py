@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Exportação do DataFrame do parser: CSV/TSV em blocos e Parquet/Arrow tipados.
+
+CSV/TSV saem em pedaços de `linhas_por_bloco` linhas direto no destino (arquivo,
+caminho ou buffer), sem montar o texto inteiro em memória. Parquet e Arrow (IPC
+"feather" v2) levam o valor em centavos (int64) e em decimal(18,2) e a data como
+date32, para quem analisa não ter de reinterpretar "1.234,56" e "dd/mm". Os dois
+formatos colunares precisam do pyarrow.
+"""
+
+from __future__ import annotations
+
+import os
+from decimal import Decimal
+from io import BytesIO
+from typing import TYPE_CHECKING, BinaryIO, Dict, Iterator, NamedTuple, Optional, Union
+
+from parser import brl_para_centavos, data_completa
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+
+CSV_ENCODING = "utf-8-sig"  # abre direto no Excel
+LINHAS_POR_BLOCO = 5000
+
+Destino = Union[str, "os.PathLike[str]", BinaryIO]
+
+
+class Formato(NamedTuple):
+    extensao: str
+    mime: str
+    colunar: bool
+
+
+FORMATOS: Dict[str, Formato] = {
+    "csv": Formato(".csv", "text/csv", False),
+    "tsv": Formato(".tsv", "text/tab-separated-values", False),
+    "parquet": Formato(".parquet", "application/vnd.apache.parquet", True),
+    "arrow": Formato(".arrow", "application/vnd.apache.arrow.file", True),
+}
+
+
+def tem_pyarrow() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def formatos_disponiveis():
+    return [nome for nome, f in FORMATOS.items() if not f.colunar or tem_pyarrow()]
+
+
+# ---------------- texto ----------------
+def iter_texto(
+    df: pd.DataFrame, sep: str = ",", encoding: Optional[str] = CSV_ENCODING,
+    linhas_por_bloco: int = LINHAS_POR_BLOCO,
+) -> Iterator[Union[bytes, str]]:
+    """CSV/TSV em pedaços: cabeçalho e depois blocos de linhas.
+
+    Com encoding, entrega bytes (o BOM do utf-8-sig só no primeiro pedaço); com
+    encoding=None, entrega str.
+    """
+    def _cod(texto: str, primeiro: bool):
+        if encoding is None:
+            return texto
+        if not primeiro and encoding.lower().replace("_", "-") == "utf-8-sig":
+            return texto.encode("utf-8")
+        return texto.encode(encoding)
+
+    yield _cod(df.iloc[:0].to_csv(index=False, sep=sep), True)
+    for ini in range(0, len(df), linhas_por_bloco):
+        yield _cod(df.iloc[ini:ini + linhas_por_bloco].to_csv(index=False, header=False, sep=sep), False)
+
+
+def escrever_texto(df: pd.DataFrame, destino: Destino, sep: str = ",", encoding: str = CSV_ENCODING,
+                   linhas_por_bloco: int = LINHAS_POR_BLOCO) -> int:
+    """Grava CSV/TSV em blocos; devolve o número de bytes escritos."""
+    if isinstance(destino, (str, os.PathLike)):
+        with open(destino, "wb") as f:
+            return escrever_texto(df, f, sep, encoding, linhas_por_bloco)
+    n = 0
+    for pedaco in iter_texto(df, sep, encoding, linhas_por_bloco):
+        n += destino.write(pedaco)
+    return n
+
+
+# ---------------- colunar ----------------
+def tabela_arrow(df: pd.DataFrame, competencia: Optional[str] = None) -> pa.Table:
+    """DataFrame do parser -> pyarrow.Table tipada.
+
+    "Data" vira date32 quando dá para saber o ano: com a competência (AAAA-MM) da
+    fatura, ou nas linhas de IOF, que já vêm com dd/mm/aaaa; fora isso fica nula,
+    e "data_texto" guarda sempre o texto original.
+    """
+    import pyarrow as pa
+
+    centavos = df["_centavos"] if "_centavos" in df.columns else brl_para_centavos(df["Valor (R$)"])
+    datas = [
+        data_completa(d, competencia) if competencia or len(d.strip()) == 10 else None
+        for d in df["Data"].astype(str)
+    ]
+    colunas = {
+        "data": pa.array(datas, pa.date32()),
+        "data_texto": pa.array(df["Data"].astype(str), pa.string()),
+        "estabelecimento": pa.array(df["Estabelecimento"].astype(str), pa.string()),
+        "centavos": pa.array(centavos, pa.int64()),
+        "valor": pa.array([Decimal(int(c)).scaleb(-2) for c in centavos], pa.decimal128(18, 2)),
+        "passada": pa.array(df["Passada"], pa.int8(), from_pandas=True),
+        "pagina": pa.array(df["Pagina"], pa.int32(), from_pandas=True),
+        "coluna": pa.array(df["Coluna"], pa.int8(), from_pandas=True),
+    }
+    if "_cartao" in df.columns:
+        colunas["cartao"] = pa.array(df["_cartao"], pa.string(), from_pandas=True)
+    return pa.table(colunas)
+
+
+def escrever_parquet(df: pd.DataFrame, destino: Destino, competencia: Optional[str] = None) -> None:
+    import pyarrow.parquet as pq
+
+    pq.write_table(tabela_arrow(df, competencia), destino)
+
+
+def escrever_arrow(df: pd.DataFrame, destino: Destino, competencia: Optional[str] = None) -> None:
+    import pyarrow.feather as feather
+
+    feather.write_feather(tabela_arrow(df, competencia), destino)
+
+
+# ---------------- fachada ----------------
+def escrever(df: pd.DataFrame, destino: Destino, formato: str = "csv", competencia: Optional[str] = None) -> None:
+    """Grava `df` em `destino` (caminho ou arquivo binário) no formato pedido."""
+    if formato not in FORMATOS:
+        raise ValueError(f"formato desconhecido: {formato!r} (opções: {', '.join(FORMATOS)})")
+    if formato == "csv":
+        escrever_texto(df, destino)
+    elif formato == "tsv":
+        escrever_texto(df, destino, sep="\t")
+    elif formato == "parquet":
+        escrever_parquet(df, destino, competencia)
+    else:
+        escrever_arrow(df, destino, competencia)
+
+
+def para_buffer(df: pd.DataFrame, formato: str = "csv", competencia: Optional[str] = None) -> BytesIO:
+    """Exporta para um BytesIO já rebobinado (ex.: st.download_button)."""
+    buf = BytesIO()
+    escrever(df, buf, formato, competencia)
+    buf.seek(0)
+    return buf
+
+
+def texto_tsv(df: pd.DataFrame) -> str:
+    """TSV como str, para a área de transferência (cola direto no Excel)."""
+    return "".join(iter_texto(df, sep="\t", encoding=None))
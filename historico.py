@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Histórico de faturas em SQLite: importação incremental com dedupe entre meses.
+
+Cada fatura entra uma vez (pelo SHA-256 do PDF) e cada lançamento uma vez (pela
+chave do parser, "dd/mm|estabelecimento normalizado|valor", com o ano resolvido
+pela competência da fatura). A chave é a PRIMARY KEY da tabela, então checar
+duplicata é um lookup no índice e não um re-merge de tudo que já foi importado.
+A stoplist de compras parceladas (cp_keys) de cada fatura também fica gravada,
+por competência.
+
+Uso:
+    python -m historico importar faturas/*.pdf --db historico.sqlite3
+    python -m historico importar fatura.pdf --competencia 2025-03
+    python -m historico consultar --cartao 1234 --de 2025-01-01 --ate 2025-03-31 --estabelecimento uber
+    python -m historico faturas
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import os
+import sqlite3
+import sys
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from cache import sha256_fonte
+from parser import (
+    BACKENDS, FontePDF, _norma, competencia_do_arquivo, data_completa, processar_pdf_com_estado, validar_competencia,
+)
+
+VERSAO_ESQUEMA = 1
+DB_PADRAO = "historico.sqlite3"
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS faturas (
+    id INTEGER PRIMARY KEY,
+    competencia TEXT NOT NULL,          -- AAAA-MM
+    sha256 TEXT NOT NULL UNIQUE,
+    arquivo TEXT,
+    importada_em TEXT NOT NULL,
+    linhas INTEGER NOT NULL,            -- lançamentos novos
+    duplicadas INTEGER NOT NULL         -- já estavam no histórico
+);
+CREATE TABLE IF NOT EXISTS lancamentos (
+    chave TEXT PRIMARY KEY,             -- "dd/mm/aaaa|estabelecimento normalizado|1234.56"
+    data TEXT NOT NULL,                 -- AAAA-MM-DD
+    estabelecimento TEXT NOT NULL,
+    estab_norm TEXT NOT NULL,
+    centavos INTEGER NOT NULL,
+    cartao TEXT,                        -- final do cartão; NULL se desconhecido
+    competencia TEXT NOT NULL,
+    fatura_id INTEGER NOT NULL REFERENCES faturas(id),
+    passada INTEGER,
+    pagina INTEGER,
+    coluna INTEGER
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_lancamentos_data ON lancamentos(data);
+CREATE INDEX IF NOT EXISTS ix_lancamentos_cartao ON lancamentos(cartao, data);
+CREATE TABLE IF NOT EXISTS stoplist_cp (
+    competencia TEXT NOT NULL,
+    chave TEXT NOT NULL,
+    PRIMARY KEY (competencia, chave)
+) WITHOUT ROWID;
+"""
+
+COLUNAS_CONSULTA = ["data", "estabelecimento", "centavos", "cartao", "competencia", "chave"]
+
+def chave_historico(chave: str, competencia: str) -> Tuple[str, str]:
+    """_key do parser -> (chave com ano, data ISO).
+
+    "dd/mm" ganha o ano da competência, ou o anterior se o mês for posterior ao
+    dela (compra de dezembro na fatura de janeiro). Linhas de IOF, que o parser
+    data com o dia da exportação, ficam no dia 1º da competência: reimportar em
+    outro dia não as duplica.
+    """
+    return _chave_historico(chave, competencia, validar_competencia(competencia))
+
+
+def _chave_historico(chave: str, competencia: str, ano_mes: Tuple[int, int]) -> Tuple[str, str]:
+    # competência já validada (uma vez por importação, não por linha)
+    data, resto = chave.split("|", 1)
+    d = date(*ano_mes, 1) if len(data) == 10 else data_completa(data, competencia)
+    return f"{d:%d/%m/%Y}|{resto}", d.isoformat()
+
+
+def _int_ou_none(valor) -> Optional[int]:
+    # Pagina/Coluna vêm vazias (None/NaN) nas linhas de IOF
+    return None if valor is None or valor != valor else int(valor)
+
+
+class Historico:
+    """Livro-razão de lançamentos em SQLite (um arquivo; ":memory:" para testes)."""
+
+    def __init__(self, caminho: str = DB_PADRAO):
+        self.caminho = caminho
+        self.conn = sqlite3.connect(caminho)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        versao = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if versao not in (0, VERSAO_ESQUEMA):
+            raise RuntimeError(f"{caminho}: esquema v{versao}, este código entende v{VERSAO_ESQUEMA}")
+        with self.conn:
+            self.conn.executescript(ESQUEMA)
+            self.conn.execute(f"PRAGMA user_version={VERSAO_ESQUEMA}")
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # --- importação ---
+    def ja_importada(self, sha256: str) -> bool:
+        return self.conn.execute("SELECT 1 FROM faturas WHERE sha256 = ?", (sha256,)).fetchone() is not None
+
+    def importar_pdf(
+        self, fonte: FontePDF, competencia: Optional[str] = None, arquivo: Optional[str] = None,
+        workers: int = 1, backend: str = "pdfplumber",
+    ) -> Dict:
+        """Processa o PDF e acrescenta os lançamentos novos ao histórico.
+
+        A competência (AAAA-MM) vem do argumento ou do nome do arquivo. Devolve
+        {"competencia", "linhas", "duplicadas", "descartadas_cp", "ignorada"};
+        "ignorada" é True quando o mesmo PDF já tinha sido importado.
+        """
+        if arquivo is None and isinstance(fonte, (str, os.PathLike)):
+            arquivo = os.fspath(fonte)
+        competencia = competencia or (arquivo and competencia_do_arquivo(arquivo))
+        if not competencia:
+            raise ValueError(f"não deu para inferir a competência de {arquivo!r}; informe AAAA-MM")
+        ano_mes = validar_competencia(competencia)
+
+        sha256 = sha256_fonte(fonte)
+        resumo = {"competencia": competencia, "linhas": 0, "duplicadas": 0, "descartadas_cp": 0, "ignorada": False}
+        if self.ja_importada(sha256):
+            resumo["ignorada"] = True
+            return resumo
+
+        fin = processar_pdf_com_estado(fonte, workers=workers, backend=backend)
+        df = fin.dataframe(internas=True)
+        stoplist = {_chave_historico(k, competencia, ano_mes)[0] for k in fin.cp_keys}
+        return self._gravar(df, stoplist, competencia, ano_mes, sha256, arquivo, resumo)
+
+    def _gravar(self, df, stoplist: Set[str], competencia: str, ano_mes: Tuple[int, int], sha256: str,
+                arquivo: Optional[str], resumo: Dict) -> Dict:
+        with self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO faturas (competencia, sha256, arquivo, importada_em, linhas, duplicadas) "
+                "VALUES (?, ?, ?, ?, 0, 0)",
+                (competencia, sha256, arquivo, datetime.now().isoformat(timespec="seconds")),
+            )
+            fatura_id = cur.lastrowid
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO stoplist_cp (competencia, chave) VALUES (?, ?)",
+                ((competencia, k) for k in stoplist),
+            )
+            # outra fatura da mesma competência já pode ter gravado parcelas futuras
+            stoplist = stoplist | self.stoplist(competencia)
+
+            linhas = []
+            for key, estab, centavos, cartao, passada, pagina, coluna in zip(
+                df["_key"], df["Estabelecimento"], df["_centavos"], df["_cartao"],
+                df["Passada"], df["Pagina"], df["Coluna"],
+            ):
+                chave, data_iso = _chave_historico(key, competencia, ano_mes)
+                if chave in stoplist:
+                    resumo["descartadas_cp"] += 1
+                    continue
+                linhas.append((
+                    chave, data_iso, estab, chave.split("|", 2)[1], int(centavos), cartao,
+                    competencia, fatura_id, int(passada), _int_ou_none(pagina), _int_ou_none(coluna),
+                ))
+            antes = self.conn.total_changes
+            self.conn.executemany("INSERT OR IGNORE INTO lancamentos VALUES (?,?,?,?,?,?,?,?,?,?,?)", linhas)
+            resumo["linhas"] = self.conn.total_changes - antes
+            resumo["duplicadas"] = len(linhas) - resumo["linhas"]
+            self.conn.execute(
+                "UPDATE faturas SET linhas = ?, duplicadas = ? WHERE id = ?",
+                (resumo["linhas"], resumo["duplicadas"], fatura_id),
+            )
+        return resumo
+
+    # --- consultas ---
+    def stoplist(self, competencia: str) -> Set[str]:
+        return {r[0] for r in self.conn.execute("SELECT chave FROM stoplist_cp WHERE competencia = ?", (competencia,))}
+
+    def contem(self, chave: str) -> bool:
+        return self.conn.execute("SELECT 1 FROM lancamentos WHERE chave = ?", (chave,)).fetchone() is not None
+
+    def consultar(
+        self, cartao: Optional[str] = None, de: Optional[str] = None, ate: Optional[str] = None,
+        estabelecimento: Optional[str] = None, competencia: Optional[str] = None,
+    ) -> Iterator[sqlite3.Row]:
+        """Lançamentos filtrados, em ordem de data, lidos do cursor aos poucos.
+
+        de/ate são datas ISO (inclusive); estabelecimento casa por trecho do nome
+        normalizado (sem acento, minúsculo).
+        """
+        filtros, params = [], []
+        if cartao:
+            filtros.append("cartao = ?")
+            params.append(cartao)
+        if de:
+            filtros.append("data >= ?")
+            params.append(de)
+        if ate:
+            filtros.append("data <= ?")
+            params.append(ate)
+        if estabelecimento:
+            filtros.append("estab_norm LIKE ? ESCAPE '\\'")
+            termo = _norma(estabelecimento).replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            params.append(f"%{termo}%")
+        if competencia:
+            filtros.append("competencia = ?")
+            params.append(competencia)
+        where = (" WHERE " + " AND ".join(filtros)) if filtros else ""
+        sql = f"SELECT {', '.join(COLUNAS_CONSULTA)} FROM lancamentos{where} ORDER BY data, chave"
+        yield from self.conn.execute(sql, params)
+
+    def faturas(self) -> List[sqlite3.Row]:
+        return self.conn.execute(
+            "SELECT id, competencia, arquivo, importada_em, linhas, duplicadas FROM faturas ORDER BY competencia, id"
+        ).fetchall()
+
+
+# ---------------- CLI ----------------
+def _escrever_csv(linhas: Iterable[sqlite3.Row], colunas: List[str]) -> int:
+    w = csv.writer(sys.stdout)
+    w.writerow(colunas)
+    n = 0
+    for r in linhas:
+        w.writerow(tuple(r))
+        n += 1
+    return n
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m historico", description="Histórico de faturas Itaú em SQLite.")
+    ap.add_argument("--db", default=os.environ.get("FATURA_HISTORICO", DB_PADRAO), help="arquivo SQLite")
+    sub = ap.add_subparsers(dest="comando", required=True)
+
+    imp = sub.add_parser("importar", help="acrescenta faturas ao histórico")
+    imp.add_argument("pdfs", nargs="+")
+    imp.add_argument("--competencia", help="AAAA-MM (padrão: tirada do nome de cada arquivo)")
+    imp.add_argument("-j", "--workers", type=int, default=1)
+    imp.add_argument("--backend", choices=sorted(BACKENDS), default="pdfplumber")
+
+    con = sub.add_parser("consultar", help="lançamentos em CSV na saída padrão")
+    con.add_argument("--cartao", help="final do cartão")
+    con.add_argument("--de", help="data inicial AAAA-MM-DD")
+    con.add_argument("--ate", help="data final AAAA-MM-DD")
+    con.add_argument("--estabelecimento", help="trecho do nome")
+    con.add_argument("--competencia", help="AAAA-MM")
+
+    sub.add_parser("faturas", help="faturas já importadas")
+    args = ap.parse_args(argv)
+
+    with Historico(args.db) as hist:
+        if args.comando == "importar":
+            falhas = 0
+            for pdf in args.pdfs:
+                try:
+                    r = hist.importar_pdf(pdf, args.competencia, workers=args.workers, backend=args.backend)
+                except Exception as e:
+                    falhas += 1
+                    print(f"ERRO {pdf}: {type(e).__name__}: {e}", file=sys.stderr)
+                    continue
+                if r["ignorada"]:
+                    print(f"{pdf}: já importado")
+                else:
+                    print(f"{pdf} [{r['competencia']}]: {r['linhas']} novos, {r['duplicadas']} duplicados, "
+                          f"{r['descartadas_cp']} na stoplist de CP")
+            return 1 if falhas else 0
+        if args.comando == "consultar":
+            n = _escrever_csv(hist.consultar(args.cartao, args.de, args.ate, args.estabelecimento, args.competencia),
+                              COLUNAS_CONSULTA)
+            print(f"{n} lançamentos", file=sys.stderr)
+            return 0
+        _escrever_csv(hist.faturas(), ["id", "competencia", "arquivo", "importada_em", "linhas", "duplicadas"])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
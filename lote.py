@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Conversão em lote de faturas Itaú (PDF -> CSV, TSV, Parquet ou Arrow).
+
+Uso:
+    python -m lote faturas/ -o saida/ -j 4 --combinado saida/todas.csv
+    python -m lote "faturas/2025-*.pdf"
+    python -m lote faturas/ -o saida/ --formato parquet --combinado saida/todas.parquet
+    python -m lote fatura.pdf --formato parquet --competencia 2025-03
+    python -m lote "faturas/**/*.pdf" -o saida/     # saida/ espelha as subpastas de faturas/
+
+Nos formatos colunares a coluna "data" (date32) precisa do ano, que a fatura só
+traz no vencimento: vem de --competencia ou do nome de cada arquivo
+("fatura_2025-03.pdf"); sem nenhum dos dois, só as linhas de IOF ganham data.
+"""
+
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from exportacao import CSV_ENCODING, FORMATOS, LINHAS_POR_BLOCO, escrever, formatos_disponiveis
+from parser import BACKENDS, competencia_do_arquivo, processar_pdf, validar_competencia
+
+
+class EntradaPdf(NamedTuple):
+    pdf: Path
+    relativo: Path  # caminho a partir da raiz da entrada (diretório ou parte fixa do glob)
+
+
+def _raiz_glob(padrao: str) -> Path:
+    # "faturas/**/*.pdf" -> "faturas": o trecho antes do primeiro curinga
+    fixas = []
+    for parte in Path(padrao).parts:
+        if glob.has_magic(parte):
+            break
+        fixas.append(parte)
+    return Path(*fixas) if fixas else Path(".")
+
+
+def listar_pdfs(entradas: List[str]) -> List[EntradaPdf]:
+    """Expande diretórios, globs e arquivos em uma lista ordenada e sem repetição."""
+    achados: List[EntradaPdf] = []
+    for ent in entradas:
+        p = Path(ent)
+        if p.is_dir():
+            achados.extend(EntradaPdf(a, a.relative_to(p)) for a in sorted(p.glob("*.pdf")) + sorted(p.glob("*.PDF")))
+        elif p.is_file():
+            achados.append(EntradaPdf(p, Path(p.name)))
+        else:
+            raiz = _raiz_glob(ent)
+            achados.extend(EntradaPdf(Path(a), Path(os.path.relpath(a, raiz)))
+                           for a in sorted(glob.glob(ent, recursive=True)))
+    vistos = set()
+    pdfs: List[EntradaPdf] = []
+    for e in achados:
+        chave = e.pdf.resolve()
+        if chave not in vistos and e.pdf.suffix.lower() == ".pdf":
+            vistos.add(chave)
+            pdfs.append(e)
+    return pdfs
+
+
+def caminho_saida(entrada: EntradaPdf, dir_saida: Optional[Path], formato: str = "csv") -> Path:
+    """Ao lado do PDF ou, com dir_saida, no mesmo caminho relativo dentro dele."""
+    ext = FORMATOS[formato].extensao
+    if dir_saida is None:
+        return entrada.pdf.with_suffix(ext)
+    return dir_saida / entrada.relativo.with_suffix(ext)
+
+
+def saidas_repetidas(pares: List[Tuple[EntradaPdf, Path]]) -> Dict[Path, List[Path]]:
+    """Saídas para as quais vai mais de um PDF (ex.: a.pdf e a.PDF, ou duas pastas passadas com -o)."""
+    por_saida: Dict[Path, List[Path]] = defaultdict(list)
+    for entrada, saida in pares:
+        por_saida[saida.resolve()].append(entrada.pdf)
+    return {saida: pdfs for saida, pdfs in por_saida.items() if len(pdfs) > 1}
+
+
+def atualizado(pdf: Path, saida: Path) -> bool:
+    return saida.exists() and saida.stat().st_mtime >= pdf.stat().st_mtime
+
+
+def _processar_arquivo(pdf: str, saida: str, backend: str = "pdfplumber", formato: str = "csv",
+                       limite_rss_mb: Optional[float] = None, competencia: Optional[str] = None) -> Tuple[int, float]:
+    # roda no worker; grava num temporário só deste job para não deixar saída pela metade
+    t0 = time.perf_counter()
+    df = processar_pdf(pdf, backend=backend, limite_rss_mb=limite_rss_mb)
+    fd, tmp = tempfile.mkstemp(prefix=Path(saida).name + ".", suffix=".tmp", dir=os.path.dirname(saida) or ".")
+    os.close(fd)
+    try:
+        escrever(df, tmp, formato, competencia)
+        os.replace(tmp, saida)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return len(df), time.perf_counter() - t0
+
+
+def escrever_combinado(saidas: List[Tuple[str, Path]], destino: Path, formato: str = "csv") -> int:
+    """Junta as saídas individuais numa só, com a coluna "Arquivo" de origem.
+
+    `saidas` é [(rótulo do PDF, arquivo de saída)]; o rótulo vai para "Arquivo".
+
+    Vai arquivo a arquivo (e, no CSV/TSV, bloco a bloco): o combinado nunca
+    fica inteiro em memória.
+    """
+    if FORMATOS[formato].colunar:
+        return _combinar_colunar(saidas, destino, formato)
+    import pandas as pd
+
+    sep = "\t" if formato == "tsv" else ","
+    n = 0
+    tmp = destino.with_name(destino.name + ".tmp")
+    with open(tmp, "w", encoding=CSV_ENCODING, newline="") as f:
+        cabecalho = False
+        for rotulo, saida in saidas:
+            for bloco in pd.read_csv(saida, sep=sep, dtype=str, keep_default_na=False, encoding=CSV_ENCODING,
+                                     chunksize=LINHAS_POR_BLOCO):
+                bloco.insert(0, "Arquivo", rotulo)
+                bloco.to_csv(f, sep=sep, index=False, header=not cabecalho)
+                cabecalho = True
+                n += len(bloco)
+        if not cabecalho:
+            f.write("Arquivo\n")
+    os.replace(tmp, destino)
+    return n
+
+
+def _combinar_colunar(saidas: List[Tuple[Path, Path]], destino: Path, formato: str) -> int:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+
+    n = 0
+    escritor = None
+    tmp = destino.with_name(destino.name + ".tmp")
+    try:
+        for rotulo, saida in saidas:
+            tabela = pq.read_table(saida) if formato == "parquet" else feather.read_table(saida)
+            tabela = tabela.add_column(0, "arquivo", pa.array([rotulo] * len(tabela), pa.string()))
+            if escritor is None:
+                escritor = (pq.ParquetWriter(tmp, tabela.schema) if formato == "parquet"
+                            else pa.ipc.new_file(tmp, tabela.schema))
+            escritor.write_table(tabela)
+            n += len(tabela)
+    finally:
+        if escritor is not None:
+            escritor.close()
+    if escritor is None:
+        return 0
+    os.replace(tmp, destino)
+    return n
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m lote", description="Converte faturas Itaú (PDF) em CSV, em lote.")
+    ap.add_argument("entradas", nargs="+", help="arquivos PDF, diretórios ou globs")
+    ap.add_argument("-o", "--saida", type=Path, help="diretório das saídas (padrão: ao lado de cada PDF)")
+    ap.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="arquivos processados em paralelo")
+    ap.add_argument("--combinado", type=Path, help="arquivo único (no --formato) com todas as faturas e a coluna Arquivo")
+    ap.add_argument("-f", "--forcar", action="store_true", help="reprocessa mesmo com saída atualizada")
+    ap.add_argument("--formato", choices=list(FORMATOS), default="csv", help="formato das saídas")
+    ap.add_argument("--limite-rss-mb", type=float,
+                    help="processa página a página e falha o arquivo se o worker passar deste RSS")
+    ap.add_argument("--competencia", help="AAAA-MM das faturas, para a data tipada do Parquet/Arrow "
+                                          "(padrão: tirada do nome de cada arquivo)")
+    ap.add_argument("--backend", choices=sorted(BACKENDS), default="pdfplumber", help="leitor de PDF")
+    args = ap.parse_args(argv)
+    if args.formato not in formatos_disponiveis():
+        ap.error(f"--formato {args.formato} precisa do pyarrow instalado")
+    if args.competencia:
+        try:
+            validar_competencia(args.competencia)
+        except ValueError as e:
+            ap.error(str(e))
+
+    pdfs = listar_pdfs(args.entradas)
+    if not pdfs:
+        print("Nenhum PDF encontrado.", file=sys.stderr)
+        return 2
+
+    pares = [(e, caminho_saida(e, args.saida, args.formato)) for e in pdfs]
+    repetidas = saidas_repetidas(pares)
+    if repetidas:
+        for saida, origens in repetidas.items():
+            print(f"ERRO        {saida} viria de {len(origens)} PDFs: {', '.join(map(str, origens))}",
+                  file=sys.stderr)
+        print("Passe as pastas num glob só (ex.: \"faturas/**/*.pdf\") para -o espelhar as subpastas, "
+              "ou renomeie os PDFs.", file=sys.stderr)
+        return 2
+    for _, saida in pares:
+        saida.parent.mkdir(parents=True, exist_ok=True)
+
+    pendentes = []
+    for e, saida in pares:
+        if args.forcar or not atualizado(e.pdf, saida):
+            pendentes.append((e.pdf, saida, args.competencia or competencia_do_arquivo(e.pdf.name)))
+        else:
+            print(f"pulado      {e.pdf} (saída atualizada)")
+    if FORMATOS[args.formato].colunar:
+        for pdf, _, competencia in pendentes:
+            if competencia is None:
+                print(f"aviso       {pdf}: sem competência (use --competencia); "
+                      "a coluna data fica nula fora das linhas de IOF", file=sys.stderr)
+
+    falhas: List[Path] = []
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, args.jobs)) as ex:
+        futuros = {
+            ex.submit(_processar_arquivo, str(pdf), str(saida), args.backend, args.formato, args.limite_rss_mb,
+                      competencia): pdf
+            for pdf, saida, competencia in pendentes
+        }
+        for fut in as_completed(futuros):
+            pdf = futuros[fut]
+            try:
+                n_linhas, seg = fut.result()
+            except Exception as e:
+                falhas.append(pdf)
+                print(f"ERRO        {pdf}: {type(e).__name__}: {e}", file=sys.stderr)
+            else:
+                print(f"ok  {seg:7.2f}s {pdf} ({n_linhas} linhas)")
+
+    print(
+        f"{len(pendentes) - len(falhas)} processado(s), {len(pares) - len(pendentes)} pulado(s), "
+        f"{len(falhas)} com erro em {time.perf_counter() - t0:.2f}s"
+    )
+
+    if args.combinado:
+        ok = [(e.relativo.as_posix(), saida) for e, saida in pares if e.pdf not in falhas and saida.exists()]
+        n = escrever_combinado(ok, args.combinado, args.formato)
+        print(f"combinado   {args.combinado} ({n} linhas)")
+
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,12 +4,25 @@
 Parser Itaú – com stoplist de Compras Parceladas (CP) capturada na Passada 2.
 """
 
+from __future__ import annotations
+
 import re
-import pdfplumber
-import pandas as pd
-from datetime import date
-from typing import Optional, Dict, List, Pattern, Set
+import os
+import sys
+import mmap
+from datetime import date, datetime
+from typing import TYPE_CHECKING, BinaryIO, Optional, Dict, Iterable, Iterator, List, Match, NamedTuple, Pattern, Set, Tuple, Union
 import unicodedata
+from contextlib import nullcontext
+from functools import lru_cache
+from io import BytesIO
+from time import perf_counter
+
+# pandas/numpy, pdfplumber (pdfminer + PIL) e multiprocessing são importados só
+# quando usados: a extração não precisa de pandas e quem só importa o módulo (CLI,
+# servidor, workers) não paga o import de tudo. Ver benchmarks/tempo_import.py.
+if TYPE_CHECKING:
+    import pandas as pd
 
 # --- Regex principais ---
 RX_TRANSACAO = re.compile(r"(\d{2}/\d{2})\s+(.+?)\s+([−-]?\s?\d{1,3}(?:\.\d{3})*,\d{2})")
@@ -84,51 +97,103 @@ def valor_para_float(valor: str) -> float:
 def float_para_brl_str(valor: float) -> str:
     return f"{valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
 
-def remover_bloco_por_marcas(texto: str, inicio_regex: Pattern, fins_regex_list: List[Pattern]) -> str:
-    while True:
-        m_ini = inicio_regex.search(texto)
-        if not m_ini:
-            break
-        start = m_ini.start()
-        seg = texto[start:]
-        fim_pos: Optional[int] = None
-        for rx in fins_regex_list:
-            m = rx.search(seg)
-            if m:
-                cand = start + m.start()
-                fim_pos = cand if fim_pos is None else min(fim_pos, cand)
-        if fim_pos is None:
-            texto = texto[:start]
-        else:
-            texto = texto[:start] + texto[fim_pos:]
-    return texto
+RegraBloco = Tuple[Pattern, List[Pattern]]  # (INICIO, [FIMs])
 
-def extrair_blocos_por_marcas(texto: str, inicio_regex: Pattern, fins_regex_list: List[Pattern]) -> List[str]:
-    """Retorna o(s) conteúdo(s) entre INICIO e o 1º FIM encontrado, repetidamente."""
-    blocos: List[str] = []
+_SEM_ANCORA: Dict[Pattern, Optional[Pattern]] = {}
+
+def _sem_ancora(rx: Pattern) -> Optional[Pattern]:
+    """Para regex com "^" inicial (sem re.M): a mesma regex sem o "^", para usar com .match(texto, pos).
+
+    As funções antigas fatiavam o texto (texto[pos:]), então o "^" casava no ponto do
+    fatiamento; com .search(texto, pos) ele só casaria na posição 0.
+    """
+    if rx not in _SEM_ANCORA:
+        ancorada = rx.pattern.startswith("^") and not rx.flags & re.M
+        _SEM_ANCORA[rx] = re.compile(rx.pattern[1:], rx.flags) if ancorada else None
+    return _SEM_ANCORA[rx]
+
+def varrer_blocos(
+    texto: str, regras: List[RegraBloco], fim_apos_inicio: bool = False
+) -> Tuple[str, List[List[str]]]:
+    """Remove, numa única varredura, os blocos INICIO..FIM de todas as regras.
+
+    Devolve o texto sem os blocos (os marcadores de FIM ficam) e, por regra, o
+    conteúdo entre INICIO e o 1º FIM. Sem FIM, o bloco vai até o final do texto.
+    Se dois blocos começam no mesmo ponto, vale a regra que vem antes na lista.
+    O FIM é procurado a partir do começo do marcador de INÍCIO (como em
+    remover_bloco_por_marcas) ou, com fim_apos_inicio, a partir do fim dele (como
+    em extrair_blocos_por_marcas).
+
+    Cada regex só anda para frente: o próximo match de cada uma fica guardado e só
+    é refeito quando o cursor passa dele, então o custo é linear no tamanho do texto.
+    """
+    proximos: Dict[Pattern, Optional[Match]] = {}
+
+    def _proximo(rx: Pattern, pos: int) -> Optional[Match]:
+        if rx in proximos:
+            m = proximos[rx]
+            if m is None or m.start() >= pos:
+                return m
+        m = rx.search(texto, pos)
+        proximos[rx] = m
+        return m
+
+    partes: List[str] = []
+    blocos: List[List[str]] = [[] for _ in regras]
     cursor = 0
+    mantido = False  # já sobrou algum texto antes do cursor?
     while True:
-        m_ini = inicio_regex.search(texto, cursor)
-        if not m_ini:
+        regra, m_ini = -1, None
+        for i, (inicio_regex, _) in enumerate(regras):
+            ancora = None if fim_apos_inicio else _sem_ancora(inicio_regex)
+            if ancora is not None:
+                # ao remover, o texto restante é reconcatenado: "^" volta a valer no cursor
+                # enquanto nada foi mantido antes dele
+                m = None if mantido else ancora.match(texto, cursor)
+            else:
+                m = _proximo(inicio_regex, cursor)
+            if m and (m_ini is None or m.start() < m_ini.start()):
+                regra, m_ini = i, m
+        if m_ini is None:
             break
-        start = m_ini.end()
-        seg = texto[start:]
+
+        pos_fim = m_ini.end() if fim_apos_inicio else m_ini.start()
         fim_pos: Optional[int] = None
-        for rx in fins_regex_list:
-            m = rx.search(seg)
-            if m:
-                cand = start + m.start()
-                if fim_pos is None or cand < fim_pos:
-                    fim_pos = cand
+        for rx in regras[regra][1]:
+            ancora = _sem_ancora(rx)
+            m = ancora.match(texto, pos_fim) if ancora is not None else _proximo(rx, pos_fim)
+            if m and (fim_pos is None or m.start() < fim_pos):
+                fim_pos = m.start()
+
+        partes.append(texto[cursor:m_ini.start()])
+        mantido = mantido or m_ini.start() > cursor
         if fim_pos is None:
-            bloco = texto[start:]
-            blocos.append(bloco)
+            blocos[regra].append(texto[m_ini.end():])
+            cursor = len(texto)
             break
-        else:
-            bloco = texto[start:fim_pos]
-            blocos.append(bloco)
-            cursor = fim_pos
-    return blocos
+        blocos[regra].append(texto[m_ini.end():fim_pos])
+        cursor = max(fim_pos, m_ini.start() + 1)  # FIM colado no INÍCIO: garante avanço
+    partes.append(texto[cursor:])
+    return "".join(partes), blocos
+
+def remover_bloco_por_marcas(texto: str, inicio_regex: Pattern, fins_regex_list: List[Pattern]) -> str:
+    return varrer_blocos(texto, [(inicio_regex, fins_regex_list)])[0]
+
+def extrair_blocos_por_marcas(texto: str, inicio_regex: Pattern, fins_regex_list: List[Pattern]) -> List[str]:
+    """Retorna o(s) conteúdo(s) entre INICIO e o 1º FIM encontrado, repetidamente."""
+    return varrer_blocos(texto, [(inicio_regex, fins_regex_list)], fim_apos_inicio=True)[1][0]
+
+# Passada 1: CP e "Fique atento" numa varredura só
+REGRAS_PASSADA_1: List[RegraBloco] = [
+    (RX_INICIO_CP, RX_FIM_CP),
+    (RX_FIQUE_ATENTO_INICIO, RX_FIM_CP),
+]
+# Passada 2: mesma ordem das limpezas antigas (fique inline -> CP inline -> fique bruto)
+REGRAS_PASSADA_2: List[RegraBloco] = [
+    (RX_FIQUE_ATENTO_INLINE, RX_FIM_FIQUE_INLINE),
+    (RX_INICIO_CP_INLINE, RX_FIM_CP_INLINE),
+    (RX_FIQUE_ATENTO_INICIO, RX_FIM_CP),
+]
 
 def remover_bloco_cp(texto: str) -> str:
     return remover_bloco_por_marcas(texto, RX_INICIO_CP, RX_FIM_CP)
@@ -146,247 +211,917 @@ def remover_bloco_internacionais(texto: str) -> str:
     return remover_bloco_por_marcas(texto, RX_INT_TITULO, RX_FIM_CP)
 
 def detectar_cartao(linha: str, cartao_atual: Optional[str]) -> Optional[str]:
-    m1 = RX_CARTAO_HEADER_1.search(linha)
-    if m1:
-        return m1.group(1)
+    # quando RX_CARTAO_HEADER_1 casa, RX_CARTAO_HEADER_2 casa no mesmo "(final ####)",
+    # então basta a segunda; e as duas exigem "("
+    if "(" not in linha:
+        return cartao_atual
     m2 = RX_CARTAO_HEADER_2.search(linha)
     if m2:
         return m2.group(1)
     return cartao_atual
 
+# Classes de linha da passada 1 (classificar_linha)
+LINHA_COMUM, LINHA_TITULO_INT, LINHA_FIM_INT, LINHA_IOF, LINHA_IGNORAR, LINHA_TRANSACAO = range(6)
+
+def classificar_linha(linha: str, em_internacionais: bool) -> Tuple[int, Optional[Match]]:
+    """Decide de uma vez o tipo da linha, com as regras e a precedência da passada 1.
+
+    Antes de cada regex confere um caractere que ela exige e que o re.I não troca:
+    "ç" do título de internacionais, "$" do IOF, "/" na 3ª posição da data. A
+    maioria das linhas sai sem rodar regex nenhuma ou só RX_TRANSACAO.
+    """
+    if ("ç" in linha or "Ç" in linha) and RX_INT_TITULO.search(linha):
+        return LINHA_TITULO_INT, None
+
+    if em_internacionais:
+        if any(rx.search(linha) for rx in RX_FIM_CP) or RX_CARTAO_HEADER_1.search(linha):
+            return LINHA_FIM_INT, None
+        m_iof = RX_INT_IOF.search(linha) if "$" in linha else None
+        if m_iof:
+            return LINHA_IOF, m_iof
+        if any(rx.search(linha) for rx in RX_INT_IGNORAR):
+            return LINHA_IGNORAR, None
+
+    m = RX_TRANSACAO.match(linha) if linha[2:3] == "/" else None
+    if m:
+        return LINHA_TRANSACAO, m
+    return LINHA_COMUM, None
+
+@lru_cache(maxsize=65536)
 def _norma(s: str) -> str:
     s = unicodedata.normalize("NFKD", str(s)).encode("ascii", "ignore").decode("ascii")
     return re.sub(r"\s+", " ", s).strip().lower()
 
+def _norm_est(s: str) -> str:
+    return re.sub(r"\s+", " ", str(s)).strip()
+
+def valor_para_centavos(valor: str) -> int:
+    """"1.234,56" -> 123456, direto do texto (sem float)."""
+    v = valor.replace(" ", "").replace("−", "-")
+    inteiro, _, dec = v.partition(",")
+    cent = int(inteiro.lstrip("-").replace(".", "") or 0) * 100 + int(dec.ljust(2, "0")[:2])
+    return -cent if inteiro.startswith("-") else cent
+
+def _centavos_transacao(valor: str) -> int:
+    # valor_para_centavos só para o grupo de valor do RX_TRANSACAO ([−-]?\s?1.234,56):
+    # sempre 2 casas, então basta tirar pontuação e sinal e fazer um int()
+    digitos = valor.replace(".", "").replace(",", "")
+    if digitos[0] in "-−":
+        return -int(digitos[1:])
+    return int(digitos)
+
+def float_para_centavos(valor: float) -> int:
+    # mesmo arredondamento de float_para_brl_str (f"{v:.2f}")
+    return int(f"{valor:.2f}".replace(".", ""))
+
+def _centavos_str(centavos: int) -> str:
+    # "1234.56" / "-0.05" — mesmo formato de f"{v:.2f}" usado nas chaves
+    sinal = "-" if centavos < 0 else ""
+    return f"{sinal}{abs(centavos) // 100}.{abs(centavos) % 100:02d}"
+
 def make_key(data: str, estab: str, valor_str: str) -> str:
-    v = round(valor_para_float(str(valor_str)), 2)
-    return f"{data.strip()}|{_norma(estab)}|{v:.2f}"
+    return f"{data.strip()}|{_norma(estab)}|{_centavos_str(valor_para_centavos(str(valor_str)))}"
 
-# ---------------- parser ----------------
-def processar_pdf(caminho_pdf: str) -> pd.DataFrame:
-    DATA_EXPORTACAO = date.today().strftime("%d/%m/%Y")
-
-    dados: List[Dict] = []
-    iof_por_cartao: Dict[str, float] = {}
-    cp_keys: Set[str] = set()  # stoplist de CP
-
-    # =======================
-    # PASSADA 1 (por linhas)
-    # =======================
-    with pdfplumber.open(caminho_pdf) as pdf:
-        for page_idx, page in enumerate(pdf.pages, start=1):
-            text = page.extract_text() or ""
-            text = remover_bloco_cp(text)
-            text = remover_bloco_fique(text)
-    
-            linhas = text.split("\n")
-            cartao: Optional[str] = None
-            em_internacionais = False
-    
-            for ln in linhas:
-                cartao = detectar_cartao(ln, cartao)
-    
-                if RX_INT_TITULO.search(ln):
-                    em_internacionais = True
-                    if cartao and cartao not in iof_por_cartao:
-                        iof_por_cartao[cartao] = 0.0
-                    if IOF_SEM_CARTAO not in iof_por_cartao:
-                        iof_por_cartao[IOF_SEM_CARTAO] = 0.0
-                    continue
-    
-                if em_internacionais:
-                    if any(rx.search(ln) for rx in RX_FIM_CP) or RX_CARTAO_HEADER_1.search(ln):
-                        em_internacionais = False
-                        continue
-    
-                    m_iof = RX_INT_IOF.search(ln)
-                    if m_iof:
-                        val_iof = valor_para_float(m_iof.group(1))
-                        chave = cartao if cartao else IOF_SEM_CARTAO
-                        iof_por_cartao[chave] = iof_por_cartao.get(chave, 0.0) + val_iof
-                        continue
-    
-                    if any(rx.search(ln) for rx in RX_INT_IGNORAR):
-                        continue
-    
-                    mtx = RX_TRANSACAO.match(ln)
-                    if mtx:
-                        data, estabelecimento, valor = mtx.groups()
-                        dados.append({
-                            "Data": data,
-                            "Estabelecimento": estabelecimento.strip(),
-                            "Valor (R$)": float_para_brl_str(valor_para_float(valor)),
-                            "Passada": 1,
-                            "Pagina": page_idx,
-                            "Coluna": 1,
-                        })
-                    continue
-    
-                m = RX_TRANSACAO.match(ln)
-                if m:
-                    data, estabelecimento, valor = m.groups()
-                    dados.append({
-                        "Data": data,
-                        "Estabelecimento": estabelecimento.strip(),
-                        "Valor (R$)": float_para_brl_str(valor_para_float(valor)),
-                        "Passada": 1,
-                        "Pagina": page_idx,
-                        "Coluna": 1,
-                    })
-
-
-    # IOF por cartão (passada 1)
-    for cartao, iof_val in iof_por_cartao.items():
-        if not iof_val:
-            continue
-        if cartao == IOF_SEM_CARTAO:
-            desc = "Repasse de IOF (transações internacionais)"
-        else:
-            desc = f"Repasse de IOF (transações internacionais) – final {cartao}"
-        dados.append({
-            "Data": DATA_EXPORTACAO,
-            "Estabelecimento": desc,
-            "Valor (R$)": float_para_brl_str(iof_val),
-            "Passada": 1,
-        })
+# "2025-03", "2025_03", "202503", "fatura-itau-2025.03.pdf", ...
+RX_COMPETENCIA_ARQUIVO = re.compile(r"(20\d{2})[-_.]?(0[1-9]|1[0-2])(?!\d)")
 
-    # =======================
-    # PASSADA 2 (coluna 2 achatada)
-    # =======================
-    with pdfplumber.open(caminho_pdf) as pdf:
-        for page_idx, page in enumerate(pdf.pages, start=1):
-            palavras = page.extract_words() or []
-            meio = page.width / 2
-            coluna_2 = [p for p in palavras if p["x0"] >= meio]
-    
-            texto_c2 = " ".join(p["text"] for p in coluna_2)
-    
-            # Remove "Fique atento" bruto
-            texto_c2 = re.sub(
-                r"Fique\s*atento.*?\(\s*\d{2}/\d{2}\s*a\s*\d{2}/\d{2}\s*\)\s*",
-                " ",
-                texto_c2,
-                flags=re.I | re.S,
-            )
-    
-            # --- CAPTURA CP PRA STOPLIST (antes de remover CP) ---
-            blocos_cp = extrair_blocos_por_marcas(texto_c2, RX_INICIO_CP_INLINE, RX_FIM_CP_INLINE)
-            for bloco in blocos_cp:
-                for m in RX_TRANSACAO.finditer(bloco):
-                    data, estabelecimento, valor = m.groups()
-                    cp_keys.add(make_key(data, estabelecimento, valor))
-    
-            # Limpezas usuais
-            texto_c2 = remover_bloco_fique_inline(texto_c2)
-            texto_c2 = remover_bloco_cp_inline(texto_c2)
-            texto_c2 = remover_bloco_fique(texto_c2)
-    
-            # tenta inferir o "final do cartão" na direita
-            cartao_c2 = None
-            m_card = RX_CARTAO_HEADER_2.search(texto_c2)
-            if m_card:
-                cartao_c2 = m_card.group(1)
-    
-            valor_iof_dir = None
-            m_iof_dir = RX_INT_IOF.search(texto_c2)
-            if m_iof_dir:
-                valor_iof_dir = valor_para_float(m_iof_dir.group(1))
-            else:
-                m_tot = RX_TOTAL_TRANS_INTER.search(texto_c2)
-                m_lan = RX_TOTAL_LANC_INTER.search(texto_c2)
-                if m_tot and m_lan:
-                    v_tot = valor_para_float(m_tot.group(1))
-                    v_lan = valor_para_float(m_lan.group(1))
-                    diff = round(v_lan - v_tot, 2)
-                    if 0 <= diff <= 50:
-                        valor_iof_dir = diff
-    
-            if valor_iof_dir is not None:
-                chave = cartao_c2 or IOF_SEM_CARTAO
-                if iof_por_cartao.get(chave, 0.0) == 0.0:
-                    iof_por_cartao[chave] = valor_iof_dir
-    
-            texto_c2 = remover_bloco_internacionais(texto_c2)
-    
-            for m in RX_TRANSACAO.finditer(texto_c2):
-                data, estabelecimento, valor = m.groups()
-                estabelecimento = estabelecimento.strip()
-                if RX_FIQUE_RABICHO.match(estabelecimento):
+def competencia_do_arquivo(nome: str) -> Optional[str]:
+    """"fatura_2025-03.pdf" -> "2025-03"; None se o nome não trouxer ano e mês."""
+    m = RX_COMPETENCIA_ARQUIVO.search(os.path.splitext(os.path.basename(nome))[0])
+    return f"{m.group(1)}-{m.group(2)}" if m else None
+
+def validar_competencia(competencia: str) -> Tuple[int, int]:
+    """"AAAA-MM" -> (ano, mês); ValueError com a mensagem para o usuário se não for."""
+    try:
+        dt = datetime.strptime(competencia, "%Y-%m")
+    except ValueError:
+        raise ValueError(f"competência inválida: {competencia!r} (use AAAA-MM)") from None
+    return dt.year, dt.month
+
+def data_completa(data: str, competencia: str) -> date:
+    """"dd/mm" + competência "AAAA-MM" -> date; "dd/mm/aaaa" (linhas de IOF) passa direto.
+
+    O ano é o da competência, ou o anterior quando o mês é posterior ao dela
+    (compra de dezembro na fatura de janeiro).
+    """
+    data = data.strip()
+    if len(data) == 10:
+        return date(int(data[6:]), int(data[3:5]), int(data[:2]))
+    ano, mes = int(competencia[:4]), int(competencia[5:7])
+    mes_l = int(data[3:5])
+    return date(ano if mes_l <= mes else ano - 1, mes_l, int(data[:2]))
+
+# ---------------- instrumentação ----------------
+class _Medicao:
+    __slots__ = ("stats", "etapa", "pagina", "t0")
+
+    def __init__(self, stats: "EstatisticasParser", etapa: str, pagina: Optional[int]):
+        self.stats, self.etapa, self.pagina = stats, etapa, pagina
+
+    def __enter__(self) -> None:
+        self.t0 = perf_counter()
+
+    def __exit__(self, *exc) -> None:
+        self.stats.registrar_tempo(self.etapa, perf_counter() - self.t0, self.pagina)
+
+class EstatisticasParser:
+    """Tempos por etapa/página e contadores de linhas. Passe uma instância para
+    processar_pdf(..., stats=...) e leia .resumo() / .por_pagina() depois."""
+
+    def __init__(self) -> None:
+        self.tempos: Dict[str, float] = {}
+        self.paginas: Dict[int, Dict[str, float]] = {}
+        self.contadores: Dict[str, int] = {}
+
+    def medir(self, etapa: str, pagina: Optional[int] = None) -> _Medicao:
+        return _Medicao(self, etapa, pagina)
+
+    def registrar_tempo(self, etapa: str, segundos: float, pagina: Optional[int] = None) -> None:
+        self.tempos[etapa] = self.tempos.get(etapa, 0.0) + segundos
+        if pagina is not None:
+            pg = self.paginas.setdefault(pagina, {})
+            pg[etapa] = pg.get(etapa, 0.0) + segundos
+
+    def contar(self, nome: str, n: int = 1) -> None:
+        self.contadores[nome] = self.contadores.get(nome, 0) + int(n)
+
+    def resumo(self) -> Dict:
+        return {
+            "tempos_ms": {k: round(v * 1000, 3) for k, v in self.tempos.items()},
+            "contadores": dict(self.contadores),
+        }
+
+    def por_pagina(self) -> pd.DataFrame:
+        """Uma linha por página, uma coluna por etapa (ms)."""
+        import pandas as pd
+        df = pd.DataFrame.from_dict(self.paginas, orient="index").sort_index() * 1000
+        df.index.name = "Pagina"
+        return df.round(3)
+
+class _SemEstatisticas:
+    # objeto nulo: com stats desligado cada medição custa uma chamada e um nullcontext
+    _ctx = nullcontext()
+
+    def medir(self, etapa: str, pagina: Optional[int] = None):
+        return self._ctx
+
+    def registrar_tempo(self, etapa: str, segundos: float, pagina: Optional[int] = None) -> None:
+        pass
+
+    def contar(self, nome: str, n: int = 1) -> None:
+        pass
+
+SEM_ESTATISTICAS = _SemEstatisticas()
+
+# ---------------- versões vetorizadas (colunas inteiras) ----------------
+def brl_para_centavos(valores: pd.Series) -> pd.Series:
+    """"1.234,56" / "-12,30" -> 123456 / -1230 (int64), sem passar por float.
+
+    Espera sempre duas casas decimais, como sai de float_para_brl_str.
+    """
+    import pandas as pd
+    limpo = (
+        valores.astype(str)
+        .str.replace(" ", "", regex=False)
+        .str.replace("−", "-", regex=False)
+        .str.replace(".", "", regex=False)
+        .str.replace(",", "", regex=False)
+    )
+    return pd.to_numeric(limpo).astype("int64")
+
+def _sinal_e_abs(centavos: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    import numpy as np
+    import pandas as pd
+    sinal = pd.Series(np.where(centavos < 0, "-", ""), index=centavos.index)
+    return sinal, centavos.abs()
+
+def centavos_para_brl(centavos: pd.Series) -> pd.Series:
+    """123456 -> "1.234,56" (mesmo formato de float_para_brl_str)."""
+    sinal, a = _sinal_e_abs(centavos)
+    # grupos de milhar com zeros à esquerda ("001.234"), depois tira os zeros/pontos iniciais
+    n = a // 100
+    grupos = [(n % 1000).astype(str).str.zfill(3)]
+    n = n // 1000
+    while (n > 0).any():
+        grupos.append((n % 1000).astype(str).str.zfill(3))
+        n = n // 1000
+    inteiro = grupos[-1]
+    for g in reversed(grupos[:-1]):
+        inteiro = inteiro + "." + g
+    inteiro = inteiro.str.lstrip("0.").replace("", "0")
+    return sinal + inteiro + "," + (a % 100).astype(str).str.zfill(2)
+
+def centavos_para_chave(centavos: pd.Series) -> pd.Series:
+    """123456 -> "1234.56" (parte numérica da _key)."""
+    sinal, a = _sinal_e_abs(centavos)
+    return sinal + (a // 100).astype(str) + "." + (a % 100).astype(str).str.zfill(2)
+
+def _mapear_unicos(serie: pd.Series, func) -> pd.Series:
+    # estabelecimentos se repetem muito: aplica func uma vez por valor distinto
+    serie = serie.astype(str)
+    mapa = {u: func(u) for u in serie.unique()}
+    return serie.map(mapa).astype(str)
+
+def chaves_transacao(df: pd.DataFrame, centavos: pd.Series) -> pd.Series:
+    """_key vetorizada: "dd/mm|estabelecimento normalizado|valor" (mesmo formato de make_key)."""
+    return (
+        df["Data"].astype(str).str.strip()
+        + "|" + _mapear_unicos(df["Estabelecimento"], lambda s: _norma(_norm_est(s)))
+        + "|" + centavos_para_chave(centavos)
+    )
+
+def finalizar_dataframe(df: pd.DataFrame, cp_keys: Set[str]) -> pd.DataFrame:
+    """Filtro de pagamentos, stoplist de CP e dedupe (prefere Passada 2), tudo vetorizado.
+
+    Recebe as colunas de COLUNAS com "Valor (R$)" em BRL; serve também para frames
+    combinados de várias faturas.
+    """
+    df = df.copy()
+    df["_centavos"] = brl_para_centavos(df["Valor (R$)"])
+    return _finalizar(df.drop(columns=["Valor (R$)"]), cp_keys)
+
+def _finalizar(df: pd.DataFrame, cp_keys: Set[str], stats=SEM_ESTATISTICAS, internas: bool = False) -> pd.DataFrame:
+    # df traz "_centavos" (int64) no lugar de "Valor (R$)": a fonte da verdade do valor
+    with stats.medir("finalizacao.pagamentos"):
+        est_norm = _mapear_unicos(df["Estabelecimento"], _norma)
+        mask_pag = est_norm.str.startswith("pagamento") | est_norm.str.contains(r"\bpagamentos?\b|\bpagto\b")
+        df = df[~mask_pag].copy()
+    stats.contar("descartadas_pagamento", mask_pag.sum())
+
+    with stats.medir("finalizacao.stoplist_cp"):
+        df["_key"] = chaves_transacao(df, df["_centavos"])
+
+        # aplica stoplist de CP
+        if cp_keys:
+            mask_cp = df["_key"].isin(cp_keys)
+            stats.contar("descartadas_cp", mask_cp.sum())
+            df = df[~mask_cp]
+
+    with stats.medir("finalizacao.dedupe"):
+        n_antes = len(df)
+        df = df.sort_values(["Data", "Estabelecimento", "_centavos", "Passada"])
+        df = df.drop_duplicates(subset=["_key"], keep="last").reset_index(drop=True)
+    stats.contar("colisoes_dedupe", n_antes - len(df))
+    stats.contar("linhas_finais", len(df))
+    # texto BRL só aqui, na saída
+    df["Valor (R$)"] = centavos_para_brl(df["_centavos"])
+    if internas:
+        return df[COLUNAS + [c for c in COLUNAS_INTERNAS if c in df.columns]]
+    return df[COLUNAS]
+
+# ---------------- extração ----------------
+# Caminho, bytes, BytesIO/arquivo aberto ou mmap
+FontePDF = Union[str, "os.PathLike[str]", bytes, bytearray, memoryview, BinaryIO, mmap.mmap]
+
+class PaginaExtraida(NamedTuple):
+    """Layout de uma página, extraído uma única vez e lido pelas três passadas."""
+    texto: str                          # extract_text() bruto (passadas 1 e 3)
+    palavras: List[Tuple[str, float]]   # (texto, x0) de extract_words() (passada 2)
+    largura: float
+
+# Folga à esquerda do meio ao recortar a coluna 2: o agrupamento de palavras só
+# olha o caractere anterior na linha, então basta cobrir a largura de um glifo.
+MARGEM_COLUNA_2 = 30.0
+
+# Sonda barata: lançamento exige data (dd/mm) e valor (0,00); IOF exige "IOF"/"inter.".
+# Tolera espaços entre os dígitos porque o pdfium separa palavras diferente do pdfminer.
+RX_SONDA_DATA = re.compile(r"\d\s*\d\s*/\s*\d\s*\d")
+RX_SONDA_VALOR = re.compile(r"\d\s*,\s*\d\s*\d")
+RX_SONDA_IOF = re.compile(r"iof|inter", re.I)
+
+def _sonda_tem_lancamentos(texto: str) -> bool:
+    if RX_SONDA_IOF.search(texto):
+        return True
+    return bool(RX_SONDA_DATA.search(texto) and RX_SONDA_VALOR.search(texto))
+
+def _pagina_de_chars(chars: List[dict], bbox: Tuple[float, float, float, float]) -> PaginaExtraida:
+    """Texto e palavras da coluna 2 a partir dos chars, com o agrupamento do pdfplumber.
+
+    É o mesmo caminho de page.extract_text()/extract_words(); os dois backends
+    caem aqui, então só muda de onde vêm os chars.
+    """
+    from pdfplumber.utils import chars_to_textmap, extract_words
+
+    largura, altura = bbox[2] - bbox[0], bbox[3] - bbox[1]
+    texto = chars_to_textmap(chars, layout_bbox=bbox, layout_width=largura, layout_height=altura).as_string
+    # passada 2 só usa palavras com x0 >= meio: agrupa só os caracteres da direita
+    meio = float(largura) / 2
+    corte = meio - MARGEM_COLUNA_2
+    direita = [c for c in chars if c["x0"] >= corte]
+    palavras = [(p["text"], p["x0"]) for p in extract_words(direita) if p["x0"] >= meio]
+    return PaginaExtraida(texto, palavras, float(largura))
+
+def extrair_pagina(page) -> PaginaExtraida:
+    return _pagina_de_chars(page.chars, page.bbox)
+
+def _fonte_para_pdfium(fonte: FontePDF):
+    if isinstance(fonte, (str, os.PathLike)):
+        return str(fonte)
+    if isinstance(fonte, bytes):
+        return fonte
+    if isinstance(fonte, BytesIO):
+        return fonte.getvalue()
+    if isinstance(fonte, (bytearray, memoryview, mmap.mmap)):
+        return bytes(fonte)
+    return fonte  # arquivo aberto: lido sob demanda pelo pdfium
+
+def _vazias_pdfium(doc) -> Set[int]:
+    vazias: Set[int] = set()
+    for i in range(len(doc)):
+        page = doc[i]
+        tp = page.get_textpage()
+        texto = tp.get_text_range()
+        tp.close()
+        page.close()
+        if texto.strip() and not _sonda_tem_lancamentos(texto):
+            vazias.add(i)
+    return vazias
+
+def paginas_sem_lancamentos(fonte: FontePDF) -> Set[int]:
+    """Índices (base 0) das páginas que nem precisam de análise de layout.
+
+    Lê o texto cru de cada página com o pdfium (bem mais barato que os chars do
+    pdfminer) e descarta as que não têm nem data+valor nem IOF: tabela de limites,
+    propaganda, avisos. Página sem texto nenhum não é descartada, por garantia;
+    sem pypdfium2 ou se ele não abrir o arquivo, nada é descartado.
+    """
+    try:
+        import pypdfium2 as pdfium
+    except ImportError:
+        return set()
+    try:
+        doc = pdfium.PdfDocument(_fonte_para_pdfium(fonte))
+    except Exception:
+        return set()
+    try:
+        return _vazias_pdfium(doc)
+    finally:
+        doc.close()
+
+def _abrir_pdf(fonte: FontePDF):
+    """pdfplumber.open direto do buffer, sem passar por arquivo temporário."""
+    import pdfplumber
+
+    if isinstance(fonte, (bytes, bytearray, memoryview)):
+        # BytesIO(bytes) compartilha o buffer imutável (sem cópia)
+        fonte = BytesIO(fonte if isinstance(fonte, bytes) else bytes(fonte))
+    return pdfplumber.open(fonte)
+
+def _fonte_para_worker(fonte: FontePDF):
+    # o que vai para os processos filhos precisa ser picklável
+    if isinstance(fonte, (str, os.PathLike, bytes)):
+        return fonte
+    if isinstance(fonte, (bytearray, memoryview)):
+        return bytes(fonte)
+    if isinstance(fonte, BytesIO):
+        return fonte.getvalue()
+    if isinstance(fonte, mmap.mmap):
+        return fonte[:]
+    fonte.seek(0)
+    return fonte.read()
+
+# ---------------- backends ----------------
+# Um backend abre o PDF e entrega PaginaExtraida por índice (base 0). `vazias` são
+# as páginas que a sonda descartou; quem extrai devolve pagina_vazia(i) para elas.
+class _DocumentoPdfplumber:
+    """pdfplumber/pdfminer: Python puro, é a referência de saída."""
+
+    def __init__(self, fonte: FontePDF, sondar: bool = True) -> None:
+        # a sonda lê o arquivo antes do pdfminer (não compartilham a posição do arquivo)
+        self.vazias = paginas_sem_lancamentos(fonte) if sondar else set()
+        self._pdf = _abrir_pdf(fonte)
+
+    def __len__(self) -> int:
+        return len(self._pdf.pages)
+
+    def extrair(self, i: int) -> PaginaExtraida:
+        page = self._pdf.pages[i]
+        try:
+            return extrair_pagina(page)
+        finally:
+            # o pdfplumber guarda chars/layout na Page até o PDF fechar; ninguém mais lê
+            page.close()
+
+    def pagina_vazia(self, i: int) -> PaginaExtraida:
+        return PaginaExtraida("", [], float(self._pdf.pages[i].width))
+
+    def close(self) -> None:
+        self._pdf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+class _DocumentoPdfium(_DocumentoPdfplumber):
+    """pypdfium2 (PDFium, em C) para os chars; agrupamento em linhas/palavras do pdfplumber.
+
+    As caixas vêm de FPDFText_GetLooseCharBox: x0/x1 batem com o pdfminer, e o
+    topo sai de base - tamanho da fonte, como no pdfminer (a descida da fonte pode
+    diferir um pouco, mas é igual para a linha toda). Páginas com /Rotate ou com
+    a MediaBox fora da origem saem em outro referencial; essas vão para o
+    pdfplumber (aberto só se aparecer alguma), e a saída continua a da referência.
+    """
+
+    def __init__(self, fonte: FontePDF, sondar: bool = True) -> None:
+        import pypdfium2 as pdfium
+        import pypdfium2.raw as pdfium_c
+
+        self._c = pdfium_c
+        self._fonte = _fonte_para_pdfium(fonte)
+        self._pdf = pdfium.PdfDocument(self._fonte)
+        self._reserva: Optional[_DocumentoPdfplumber] = None
+        self.vazias = _vazias_pdfium(self._pdf) if sondar else set()
+
+    def _fora_do_padrao(self, page) -> bool:
+        mx0, my0, _, _ = page.get_mediabox()
+        return page.get_rotation() != 0 or mx0 != 0 or my0 != 0
+
+    def _pdfplumber(self) -> _DocumentoPdfplumber:
+        if self._reserva is None:
+            self._reserva = _DocumentoPdfplumber(self._fonte, sondar=False)
+        return self._reserva
+
+    def __len__(self) -> int:
+        return len(self._pdf)
+
+    def _bbox(self, page) -> Tuple[Tuple[float, float, float, float], float, float]:
+        # coordenadas do pdfplumber: origem no canto superior esquerdo da mediabox
+        mx0, _, _, mtopo = page.get_mediabox()
+        cx0, cy0, cx1, cy1 = page.get_cropbox()
+        return (cx0 - mx0, mtopo - cy1, cx1 - mx0, mtopo - cy0), mx0, mtopo
+
+    def extrair(self, i: int) -> PaginaExtraida:
+        c = self._c
+        page = self._pdf[i]
+        if self._fora_do_padrao(page):
+            page.close()
+            return self._pdfplumber().extrair(i)
+        tp = page.get_textpage()
+        try:
+            bbox, mx0, mtopo = self._bbox(page)
+            raw, caixa = tp.raw, c.FS_RECTF()
+            caixa_solta, tamanho_fonte, angulo = c.FPDFText_GetLooseCharBox, c.FPDFText_GetFontSize, c.FPDFText_GetCharAngle
+            gerado = c.FPDFText_IsGenerated
+            n = tp.count_chars()
+            texto = tp.get_text_range(0, n)
+            if len(texto) != n:  # pares substitutos: volta para um caractere por chamada
+                texto = "".join(chr(c.FPDFText_GetUnicode(raw, k)) for k in range(n))
+            chars = []
+            for k, ch in enumerate(texto):
+                # o pdfium inventa espaços/quebras entre palavras e linhas; o pdfminer não
+                if ch.isspace() and gerado(raw, k):
                     continue
-                dados.append({
-                    "Data": data,
-                    "Estabelecimento": estabelecimento,
-                    "Valor (R$)": float_para_brl_str(valor_para_float(valor)),
-                    "Passada": 2,
-                    "Pagina": page_idx,
-                    "Coluna": 2,
+                caixa_solta(raw, k, caixa)
+                tamanho = tamanho_fonte(raw, k)
+                # PDFium devolve float32: arredonda para a precisão do pdfminer (milésimo de ponto)
+                base = round(mtopo - caixa.bottom, 3)
+                x0, x1 = round(caixa.left - mx0, 3), round(caixa.right - mx0, 3)
+                chars.append({
+                    "text": ch, "x0": x0, "x1": x1, "top": base - tamanho, "bottom": base,
+                    "doctop": base - tamanho, "width": x1 - x0, "height": tamanho,
+                    "size": tamanho, "upright": angulo(raw, k) == 0,
                 })
-        # =======================
-        # PASSADA 3 – Fallback robusto de IOF (por página, texto bruto)
-        # =======================
-        with pdfplumber.open(caminho_pdf) as pdf:
-            for page in pdf.pages:
-                txt = page.extract_text() or ""
-                cartao_local = None
-        
-                # 3.1) Tenta capturar pelo "Repasse de IOF ..." linha a linha
-                for ln in txt.split("\n"):
-                    # acompanha o "final ####" da página
-                    m_card = RX_CARTAO_HEADER_1.search(ln) or RX_CARTAO_HEADER_2.search(ln)
-                    if m_card:
-                        cartao_local = m_card.group(1)
-        
-                    m_iof = RX_INT_IOF.search(ln)
-                    if m_iof:
-                        chave = cartao_local or IOF_SEM_CARTAO
-                        if iof_por_cartao.get(chave, 0.0) == 0.0:
-                            iof_por_cartao[chave] = valor_para_float(m_iof.group(1))
-        
-                # 3.2) Se ainda não pegou IOF nessa página, tenta diferença de totais
-                #     (usa o mesmo cartao_local, se houver)
-                chave_fallback = cartao_local or IOF_SEM_CARTAO
-                if iof_por_cartao.get(chave_fallback, 0.0) == 0.0:
-                    m_tot = RX_TOTAL_TRANS_INTER.search(txt)
-                    m_lan = RX_TOTAL_LANC_INTER.search(txt)
-                    if m_tot and m_lan:
-                        v_tot = valor_para_float(m_tot.group(1))
-                        v_lan = valor_para_float(m_lan.group(1))
-                        diff = round(v_lan - v_tot, 2)
-                        if 0 <= diff <= 50:
-                            iof_por_cartao[chave_fallback] = diff
+            return _pagina_de_chars(chars, bbox)
+        finally:
+            tp.close()
+            page.close()
+
+    def pagina_vazia(self, i: int) -> PaginaExtraida:
+        page = self._pdf[i]
+        try:
+            if self._fora_do_padrao(page):
+                return self._pdfplumber().pagina_vazia(i)
+            bbox, _, _ = self._bbox(page)
+        finally:
+            page.close()
+        return PaginaExtraida("", [], float(bbox[2] - bbox[0]))
+
+    def close(self) -> None:
+        if self._reserva is not None:
+            self._reserva.close()
+        self._pdf.close()
+
+BACKENDS = {
+    "pdfplumber": _DocumentoPdfplumber,
+    "pdfium": _DocumentoPdfium,
+}
+
+def abrir_documento(fonte: FontePDF, backend: str = "pdfplumber", sondar: bool = True):
+    """Abre o PDF no backend pedido ("pdfplumber" ou "pdfium"; este exige pypdfium2)."""
+    try:
+        cls = BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"backend desconhecido: {backend!r} (opções: {', '.join(BACKENDS)})") from None
+    return cls(fonte, sondar=sondar)
+
+def _extrair_intervalo(fonte: FontePDF, inicio: int, fim: int, vazias: Set[int], backend: str) -> List[PaginaExtraida]:
+    # roda no processo filho: cada worker abre o PDF por conta própria
+    with abrir_documento(fonte, backend, sondar=False) as doc:
+        return [doc.pagina_vazia(i) if i in vazias else doc.extrair(i) for i in range(inicio, fim)]
+
+def _extrair_medindo(doc, page_idx: int, stats) -> PaginaExtraida:
+    if page_idx - 1 in doc.vazias:
+        stats.contar("paginas_puladas")
+        return doc.pagina_vazia(page_idx - 1)
+    with stats.medir("extracao", page_idx):
+        return doc.extrair(page_idx - 1)
+
+def _abrir_medindo(fonte: FontePDF, backend: str, stats):
+    with stats.medir("abertura"):
+        return abrir_documento(fonte, backend)
+
+def extrair_paginas(
+    fonte: FontePDF, workers: int = 1, stats=SEM_ESTATISTICAS, backend: str = "pdfplumber"
+) -> List[PaginaExtraida]:
+    """Abre o PDF uma vez e roda a análise de layout uma vez por página.
+
+    Com workers > 1 as páginas são divididas em faixas contíguas e extraídas num
+    ProcessPoolExecutor; o resultado volta sempre na ordem das páginas. Páginas
+    descartadas pela sonda (paginas_sem_lancamentos) voltam vazias, sem layout.
+    backend escolhe quem lê os chars (ver BACKENDS).
+    """
+    with _abrir_medindo(fonte, backend, stats) as doc:
+        if workers <= 1 or len(doc) <= 1:
+            return [_extrair_medindo(doc, i, stats) for i in range(1, len(doc) + 1)]
+        n_paginas = len(doc)
+        vazias = doc.vazias
+    stats.contar("paginas_puladas", len(vazias))
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    # ~2 faixas por worker para equilibrar páginas mais pesadas
+    n_faixas = min(n_paginas, workers * 2)
+    limites = [round(i * n_paginas / n_faixas) for i in range(n_faixas + 1)]
+    fonte_worker = _fonte_para_worker(fonte)
+    paginas: List[PaginaExtraida] = []
+    with stats.medir("extracao"), ProcessPoolExecutor(max_workers=workers) as ex:
+        futuros = [
+            ex.submit(_extrair_intervalo, fonte_worker, ini, fim, vazias, backend)
+            for ini, fim in zip(limites, limites[1:])
+        ]
+        for fut in futuros:
+            paginas.extend(fut.result())
+    return paginas
+
+def iter_paginas(fonte: FontePDF, stats=SEM_ESTATISTICAS, backend: str = "pdfplumber") -> Iterator[PaginaExtraida]:
+    """Como extrair_paginas, mas entrega uma página por vez (o PDF fica aberto até o fim)."""
+    with _abrir_medindo(fonte, backend, stats) as doc:
+        for page_idx in range(1, len(doc) + 1):
+            yield _extrair_medindo(doc, page_idx, stats)
+
+# ---------------- memória ----------------
+class LimiteMemoriaExcedido(MemoryError):
+    """O RSS do processo passou de limite_rss_mb durante processar_pdf."""
+
+def rss_mb() -> float:
+    """RSS atual do processo, em MB (0.0 onde não dá para medir)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0.0
+    # fora do Linux, o melhor disponível é o pico (KB no Linux, bytes no macOS)
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / 2**20 if sys.platform == "darwin" else pico / 1024
+
+def _devolver_memoria() -> None:
+    import gc
+
+    gc.collect()
+    try:  # glibc segura páginas livres; malloc_trim devolve ao sistema
+        import ctypes
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+def _conferir_memoria(limite_mb: Optional[float], page_idx: int, stats) -> None:
+    if limite_mb is None:
+        return
+    if rss_mb() <= limite_mb:
+        return
+    _devolver_memoria()
+    stats.contar("coletas_memoria")
+    rss = rss_mb()
+    if rss > limite_mb:
+        raise LimiteMemoriaExcedido(f"RSS de {rss:.1f} MB passou do limite de {limite_mb:g} MB (página {page_idx})")
+
+# ---------------- registros ----------------
+class Transacao:
+    """Uma linha de lançamento. O valor fica em centavos; o texto BRL só sai na exportação."""
+    __slots__ = ("data", "estabelecimento", "centavos", "passada", "pagina", "coluna", "cartao")
+
+    def __init__(self, data: str, estabelecimento: str, centavos: int, passada: int,
+                 pagina: Optional[int] = None, coluna: Optional[int] = None, cartao: Optional[str] = None):
+        self.data = data
+        self.estabelecimento = estabelecimento
+        self.centavos = centavos
+        self.passada = passada
+        self.pagina = pagina
+        self.coluna = coluna
+        self.cartao = cartao  # "final" do cartão, quando dá para saber (não vai para COLUNAS)
+
+    @property
+    def valor_brl(self) -> str:
+        return float_para_brl_str(self.centavos / 100)
+
+    def como_linha(self) -> Dict:
+        return dict(zip(COLUNAS, (self.data, self.estabelecimento, self.valor_brl,
+                                  self.passada, self.pagina, self.coluna)))
+
+    def __eq__(self, outro) -> bool:
+        if not isinstance(outro, Transacao):
+            return NotImplemented
+        return all(getattr(self, a) == getattr(outro, a) for a in self.__slots__)
+
+    def __repr__(self) -> str:
+        return (f"Transacao({self.data!r}, {self.estabelecimento!r}, {self.valor_brl}, "
+                f"passada={self.passada}, pagina={self.pagina}, coluna={self.coluna})")
+
+    def __getstate__(self):
+        return tuple(getattr(self, a) for a in self.__slots__)
+
+    def __setstate__(self, estado) -> None:
+        for a, v in zip(self.__slots__, estado):
+            setattr(self, a, v)
+
+COLUNAS = ["Data", "Estabelecimento", "Valor (R$)", "Passada", "Pagina", "Coluna"]
+# valor em centavos, chave de dedupe e final do cartão (None se desconhecido)
+COLUNAS_INTERNAS = ["_centavos", "_key", "_cartao"]
+
+class ResultadoPagina(NamedTuple):
+    """Tudo o que uma página contribui; o que cruza páginas fica como eventos para o Finalizador."""
+    passada_1: List[Transacao]
+    passada_2: List[Transacao]
+    iof_p1: List[Tuple[str, float]]   # soma em iof_por_cartao (0.0 = só registra o cartão)
+    iof_p2: List[Tuple[str, float]]   # grava se o cartão ainda estiver zerado
+    iof_p3: List[Tuple[str, float]]   # idem, depois de todas as páginas da passada 2
+    cp_keys: Set[str]                 # stoplist de CP
+    cartao_final: Optional[str] = None  # cartão em vigor no fim da página (continua na próxima)
+
+# ---------------- passadas (por página) ----------------
+def _passada_1(pag: PaginaExtraida, page_idx: int, res: ResultadoPagina, stats=SEM_ESTATISTICAS) -> Optional[str]:
+    with stats.medir("passada_1.blocos", page_idx):
+        text, _ = varrer_blocos(pag.texto, REGRAS_PASSADA_1)
+    with stats.medir("passada_1.linhas", page_idx):
+        return _passada_1_linhas(text, page_idx, res)
+
+def _passada_1_linhas(text: str, page_idx: int, res: ResultadoPagina) -> Optional[str]:
+    """Lançamentos e IOF da passada 1; devolve o último cartão visto na página."""
+    cartao: Optional[str] = None
+    em_internacionais = False
+
+    for ln in text.split("\n"):
+        cartao = detectar_cartao(ln, cartao)
+        tipo, m = classificar_linha(ln, em_internacionais)
+
+        if tipo == LINHA_TRANSACAO:
+            data, estabelecimento, valor = m.groups()
+            res.passada_1.append(Transacao(
+                data, estabelecimento.strip(), _centavos_transacao(valor), 1, page_idx, 1, cartao
+            ))
+        elif tipo == LINHA_TITULO_INT:
+            em_internacionais = True
+            if cartao:
+                res.iof_p1.append((cartao, 0.0))
+            res.iof_p1.append((IOF_SEM_CARTAO, 0.0))
+        elif tipo == LINHA_FIM_INT:
+            em_internacionais = False
+        elif tipo == LINHA_IOF:
+            chave = cartao if cartao else IOF_SEM_CARTAO
+            res.iof_p1.append((chave, valor_para_float(m.group(1))))
+    return cartao
+
+def _passada_2(pag: PaginaExtraida, page_idx: int, res: ResultadoPagina, stats=SEM_ESTATISTICAS) -> Optional[str]:
+    with stats.medir("passada_2.limpeza", page_idx):
+        texto_c2 = _passada_2_limpeza(pag, res)
+    with stats.medir("passada_2.iof", page_idx):
+        _passada_2_iof(texto_c2, res)
+    with stats.medir("passada_2.lancamentos", page_idx):
+        texto_c2 = remover_bloco_internacionais(texto_c2)
+        return _passada_2_lancamentos(texto_c2, page_idx, res)
+
+def _passada_2_limpeza(pag: PaginaExtraida, res: ResultadoPagina) -> str:
+    meio = pag.largura / 2
+    coluna_2 = [t for t, x0 in pag.palavras if x0 >= meio]
+
+    texto_c2 = " ".join(coluna_2)
+
+    # Remove "Fique atento" bruto
+    texto_c2 = re.sub(
+        r"Fique\s*atento.*?\(\s*\d{2}/\d{2}\s*a\s*\d{2}/\d{2}\s*\)\s*",
+        " ",
+        texto_c2,
+        flags=re.I | re.S,
+    )
 
+    # --- CAPTURA CP PRA STOPLIST (antes de remover CP) ---
+    blocos_cp = extrair_blocos_por_marcas(texto_c2, RX_INICIO_CP_INLINE, RX_FIM_CP_INLINE)
+    for bloco in blocos_cp:
+        for m in RX_TRANSACAO.finditer(bloco):
+            data, estabelecimento, valor = m.groups()
+            res.cp_keys.add(make_key(data, estabelecimento, valor))
+
+    # Limpezas usuais (fique inline, CP inline e fique bruto numa varredura)
+    texto_c2, _ = varrer_blocos(texto_c2, REGRAS_PASSADA_2)
+    return texto_c2
+
+def _passada_2_iof(texto_c2: str, res: ResultadoPagina) -> None:
+    # tenta inferir o "final do cartão" na direita
+    cartao_c2 = None
+    m_card = RX_CARTAO_HEADER_2.search(texto_c2)
+    if m_card:
+        cartao_c2 = m_card.group(1)
+
+    valor_iof_dir = None
+    m_iof_dir = RX_INT_IOF.search(texto_c2)
+    if m_iof_dir:
+        valor_iof_dir = valor_para_float(m_iof_dir.group(1))
+    else:
+        m_tot = RX_TOTAL_TRANS_INTER.search(texto_c2)
+        m_lan = RX_TOTAL_LANC_INTER.search(texto_c2)
+        if m_tot and m_lan:
+            v_tot = valor_para_float(m_tot.group(1))
+            v_lan = valor_para_float(m_lan.group(1))
+            diff = round(v_lan - v_tot, 2)
+            if 0 <= diff <= 50:
+                valor_iof_dir = diff
+
+    if valor_iof_dir is not None:
+        res.iof_p2.append((cartao_c2 or IOF_SEM_CARTAO, valor_iof_dir))
+
+def _passada_2_lancamentos(texto_c2: str, page_idx: int, res: ResultadoPagina) -> Optional[str]:
+    # cartão: último "(final ####)" antes do lançamento na coluna da direita; antes do
+    # primeiro, vale o do último lançamento da esquerda (a coluna 2 continua a 1).
+    # Devolve o último cabeçalho da coluna (None se ela não tiver nenhum).
+    cabecalhos = [(m.start(), m.group(1)) for m in RX_CARTAO_HEADER_2.finditer(texto_c2)] if "(" in texto_c2 else []
+    cartao = next((t.cartao for t in reversed(res.passada_1) if t.cartao), None)
+    i_cab = 0
+    for m in RX_TRANSACAO.finditer(texto_c2):
+        while i_cab < len(cabecalhos) and cabecalhos[i_cab][0] < m.start():
+            cartao = cabecalhos[i_cab][1]
+            i_cab += 1
+        data, estabelecimento, valor = m.groups()
+        estabelecimento = estabelecimento.strip()
+        if RX_FIQUE_RABICHO.match(estabelecimento):
+            continue
+        res.passada_2.append(Transacao(
+            data, estabelecimento, _centavos_transacao(valor), 2, page_idx, 2, cartao
+        ))
+    return cabecalhos[-1][1] if cabecalhos else None
+
+def _passada_3(pag: PaginaExtraida, res: ResultadoPagina) -> None:
+    # Fallback robusto de IOF (por página, texto bruto)
+    txt = pag.texto
+    cartao_local = None
+
+    # 3.1) Tenta capturar pelo "Repasse de IOF ..." linha a linha
+    for ln in txt.split("\n"):
+        # acompanha o "final ####" da página
+        m_card = RX_CARTAO_HEADER_1.search(ln) or RX_CARTAO_HEADER_2.search(ln)
+        if m_card:
+            cartao_local = m_card.group(1)
+
+        m_iof = RX_INT_IOF.search(ln)
+        if m_iof:
+            res.iof_p3.append((cartao_local or IOF_SEM_CARTAO, valor_para_float(m_iof.group(1))))
+
+    # 3.2) Se ainda não pegou IOF nessa página, tenta diferença de totais
+    #     (usa o mesmo cartao_local, se houver)
+    m_tot = RX_TOTAL_TRANS_INTER.search(txt)
+    m_lan = RX_TOTAL_LANC_INTER.search(txt)
+    if m_tot and m_lan:
+        v_tot = valor_para_float(m_tot.group(1))
+        v_lan = valor_para_float(m_lan.group(1))
+        diff = round(v_lan - v_tot, 2)
+        if 0 <= diff <= 50:
+            res.iof_p3.append((cartao_local or IOF_SEM_CARTAO, diff))
+
+def processar_pagina(pag: PaginaExtraida, page_idx: int, stats=SEM_ESTATISTICAS) -> ResultadoPagina:
+    """Roda as três passadas numa página. Não depende das outras páginas."""
+    res = ResultadoPagina([], [], [], [], [], set())
+    cartao_1 = _passada_1(pag, page_idx, res, stats)
+    cartao_2 = _passada_2(pag, page_idx, res, stats)
+    with stats.medir("passada_3.iof", page_idx):
+        _passada_3(pag, res)
+    # a coluna da direita é lida depois da esquerda: o cabeçalho dela é o mais recente
+    return res._replace(cartao_final=cartao_2 or cartao_1)
+
+# ---------------- finalização (entre páginas) ----------------
+def _dedupe_iof(iof_dict: Dict[str, float]) -> Dict[str, float]:
+    # normaliza/arrenda
+    for k in list(iof_dict.keys()):
+        try:
+            iof_dict[k] = round(float(iof_dict[k]), 2)
+        except Exception:
+            iof_dict[k] = 0.0
+
+    if IOF_SEM_CARTAO in iof_dict:
+        gen = iof_dict[IOF_SEM_CARTAO]
+        specs = {k: v for k, v in iof_dict.items() if k != IOF_SEM_CARTAO and v > 0}
+
+        if specs:
+            # Remove o genérico se:
+            # 1) houver valor específico igual a ele (dentro da tolerância), ou
+            # 2) a soma dos específicos “bate” com o genérico (alguns layout somam por cartão)
+            soma_specs = round(sum(specs.values()), 2)
+            match_algum = any(abs(gen - v) <= 0.01 for v in specs.values())
+            match_soma  = abs(gen - soma_specs) <= 0.01
+
+            if match_algum or match_soma or gen <= 0.01:
+                iof_dict.pop(IOF_SEM_CARTAO, None)
+
+    return iof_dict
+
+def _desc_iof(cartao: str) -> str:
+    if cartao == IOF_SEM_CARTAO:
+        return "Repasse de IOF (transações internacionais)"
+    return f"Repasse de IOF (transações internacionais) – final {cartao}"
+
+def _cartao_iof(cartao: str) -> Optional[str]:
+    return None if cartao == IOF_SEM_CARTAO else cartao
+
+class Finalizador:
+    """Junta os ResultadoPagina (em ordem de página) e monta o DataFrame final.
+
+    É aqui que vive o que cruza páginas: IOF por cartão (passadas 1 → 2 → 3, nessa
+    ordem, como se cada passada tivesse percorrido o PDF inteiro), stoplist de CP,
+    filtro de pagamentos, dedupe por _key e o cartão de páginas de continuação
+    (lançamentos antes do primeiro cabeçalho da página ficam com o cartão em que a
+    página anterior terminou).
+    """
+
+    def __init__(self, stats=None) -> None:
+        self.stats = stats or SEM_ESTATISTICAS
+        self.passada_1: List[Transacao] = []
+        self.passada_2: List[Transacao] = []
+        self.iof_p1: Dict[str, float] = {}
+        self.iof_p2: List[Tuple[str, float]] = []
+        self.iof_p3: List[Tuple[str, float]] = []
+        self.cp_keys: Set[str] = set()
+        self.n_paginas = 0
+        self._cartao: Optional[str] = None  # em vigor no fim da última página adicionada
+
+    def _continuar_cartao(self, ts: List[Transacao]) -> List[Transacao]:
+        # o cartão só fica None antes do primeiro cabeçalho da página
+        if self._cartao is None or not ts or ts[0].cartao is not None:
+            return ts
+        return [t if t.cartao is not None else
+                Transacao(t.data, t.estabelecimento, t.centavos, t.passada, t.pagina, t.coluna, self._cartao)
+                for t in ts]
+
+    def adicionar(self, res: ResultadoPagina) -> None:
+        self.n_paginas += 1
+        self.passada_1.extend(self._continuar_cartao(res.passada_1))
+        self.passada_2.extend(self._continuar_cartao(res.passada_2))
+        self._cartao = res.cartao_final or self._cartao
+        for chave, val in res.iof_p1:
+            self.iof_p1[chave] = self.iof_p1.get(chave, 0.0) + val
+        self.iof_p2.extend(res.iof_p2)
+        self.iof_p3.extend(res.iof_p3)
+        self.cp_keys |= res.cp_keys
+        self.stats.contar("linhas_passada_1", len(res.passada_1))
+        self.stats.contar("linhas_passada_2", len(res.passada_2))
+
+    def dataframe(self, internas: bool = False) -> pd.DataFrame:
+        """DataFrame final (COLUNAS); com internas=True leva também COLUNAS_INTERNAS."""
+        with self.stats.medir("finalizacao"):
+            return self._dataframe(internas)
+
+    def _dataframe(self, internas: bool = False) -> pd.DataFrame:
+        import numpy as np
+        import pandas as pd
+        DATA_EXPORTACAO = date.today().strftime("%d/%m/%Y")
+        t_iof = perf_counter()
+
+        dados: List[Transacao] = list(self.passada_1)
+        iof_por_cartao: Dict[str, float] = dict(self.iof_p1)
+
+        # IOF por cartão (passada 1)
+        for cartao, iof_val in iof_por_cartao.items():
+            if not iof_val:
+                continue
+            dados.append(Transacao(DATA_EXPORTACAO, _desc_iof(cartao), float_para_centavos(iof_val), 1,
+                                   cartao=_cartao_iof(cartao)))
+
+        dados.extend(self.passada_2)
+
+        # IOF das passadas 2 e 3: só preenche cartão ainda zerado
+        for chave, val in self.iof_p2 + self.iof_p3:
+            if iof_por_cartao.get(chave, 0.0) == 0.0:
+                iof_por_cartao[chave] = val
 
         # =======================
         # DEDUPE DE IOF (preferir específico ao genérico)
         # =======================
-        def _dedupe_iof(iof_dict: Dict[str, float]) -> Dict[str, float]:
-            # normaliza/arrenda
-            for k in list(iof_dict.keys()):
-                try:
-                    iof_dict[k] = round(float(iof_dict[k]), 2)
-                except Exception:
-                    iof_dict[k] = 0.0
-        
-            if IOF_SEM_CARTAO in iof_dict:
-                gen = iof_dict[IOF_SEM_CARTAO]
-                specs = {k: v for k, v in iof_dict.items() if k != IOF_SEM_CARTAO and v > 0}
-        
-                if specs:
-                    # Remove o genérico se:
-                    # 1) houver valor específico igual a ele (dentro da tolerância), ou
-                    # 2) a soma dos específicos “bate” com o genérico (alguns layout somam por cartão)
-                    soma_specs = round(sum(specs.values()), 2)
-                    match_algum = any(abs(gen - v) <= 0.01 for v in specs.values())
-                    match_soma  = abs(gen - soma_specs) <= 0.01
-        
-                    if match_algum or match_soma or gen <= 0.01:
-                        iof_dict.pop(IOF_SEM_CARTAO, None)
-        
-            return iof_dict
-        
         # Aplique a dedupe ANTES de materializar as linhas de IOF:
         iof_por_cartao = _dedupe_iof(iof_por_cartao)
-        
+
         # =======================
         # MATERIALIZA IOF (sem duplicar)
         # =======================
@@ -394,57 +1129,108 @@ def processar_pdf(caminho_pdf: str) -> pd.DataFrame:
         for cartao, iof_val in iof_por_cartao.items():
             if not iof_val or iof_val <= 0:
                 continue
-            if cartao == IOF_SEM_CARTAO:
-                desc = "Repasse de IOF (transações internacionais)"
-            else:
-                desc = f"Repasse de IOF (transações internacionais) – final {cartao}"
-        
+            desc = _desc_iof(cartao)
+
             key = (desc, round(iof_val, 2))
             if key in iof_rows_seen:
                 continue  # evita duplicar mesma linha
             iof_rows_seen.add(key)
-        
-            dados.append({
-                "Data": DATA_EXPORTACAO,
-                "Estabelecimento": desc,
-                "Valor (R$)": float_para_brl_str(iof_val),
-                "Passada": 1,
-                "Pagina": None, "Coluna": None, "Bloco": "INTERNACIONAL",
-            })
-
-
-
-    # =======================
-    # DF final
-    # =======================
-    df = pd.DataFrame(
-        dados,
-        columns=["Data", "Estabelecimento", "Valor (R$)", "Passada", "Pagina", "Coluna"]
-    )
 
-    est_norm = df["Estabelecimento"].astype(str).map(_norma)
-    mask_pag = est_norm.str.startswith("pagamento") | est_norm.str.contains(r"\bpagamentos?\b|\bpagto\b")
-    df = df[~mask_pag].copy()
+            dados.append(Transacao(DATA_EXPORTACAO, desc, float_para_centavos(iof_val), 1,
+                                   cartao=_cartao_iof(cartao)))
 
-    # Normalização de valores e deduplicação (prefere Passada 2)
-    df["_valor_num"] = df["Valor (R$)"].apply(lambda s: valor_para_float(str(s)))
-    df["Valor (R$)"] = df["_valor_num"].apply(lambda v: float_para_brl_str(round(v, 2)))
+        self.stats.registrar_tempo("finalizacao.iof", perf_counter() - t_iof)
+        self.stats.contar("linhas_iof", len(dados) - len(self.passada_1) - len(self.passada_2))
+        self.stats.contar("cp_keys", len(self.cp_keys))
 
-    def _norm_est(s: str) -> str:
-        return re.sub(r"\s+", " ", str(s)).strip()
-
-    df["_key"] = (
-        df["Data"].astype(str).str.strip()
-        + "|" + df["Estabelecimento"].map(_norm_est).map(_norma)
-        + "|" + df["_valor_num"].round(2).map(lambda v: f"{v:.2f}")
-    )
+        # =======================
+        # DF final
+        # =======================
+        df = pd.DataFrame({
+            "Data": [t.data for t in dados],
+            "Estabelecimento": [t.estabelecimento for t in dados],
+            "_centavos": np.fromiter((t.centavos for t in dados), dtype=np.int64, count=len(dados)),
+            "Passada": [t.passada for t in dados],
+            "Pagina": [t.pagina for t in dados],
+            "Coluna": [t.coluna for t in dados],
+            "_cartao": [t.cartao for t in dados],
+        })
+        return _finalizar(df, self.cp_keys, self.stats, internas)
 
-    # aplica stoplist de CP
-    if cp_keys:
-        df = df[~df["_key"].isin(cp_keys)].copy()
+# ---------------- parser ----------------
+def processar_pdf(
+    fonte: FontePDF, workers: int = 1, stats: Optional[EstatisticasParser] = None, backend: str = "pdfplumber",
+    pouca_memoria: bool = False, limite_rss_mb: Optional[float] = None,
+) -> pd.DataFrame:
+    """Extrai as transações da fatura (caminho, bytes, BytesIO ou mmap).
 
-    df = df.sort_values(["Data", "Estabelecimento", "_valor_num", "Passada"])
-    df = df.drop_duplicates(subset=["_key"], keep="last").reset_index(drop=True)
-    df = df.drop(columns=["_key", "_valor_num"])
+    workers > 1 paraleliza a extração das páginas; as passadas rodam depois, em
+    ordem de página, então a saída é a mesma do modo serial. Com stats, registra
+    tempos por página/etapa e contadores de linhas (ver EstatisticasParser).
+    backend="pdfium" lê os chars com o pypdfium2, bem mais rápido que o pdfminer.
 
+    pouca_memoria processa página a página: cada PaginaExtraida é descartada logo
+    depois das passadas e só o resumo compacto (Transacao, IOF, cp_keys) fica no
+    Finalizador até o fim. Com limite_rss_mb (que implica pouca_memoria), o RSS é
+    conferido a cada página; passou, coleta e devolve memória ao sistema e, se
+    ainda estiver acima, levanta LimiteMemoriaExcedido.
+    """
+    stats = stats or SEM_ESTATISTICAS
+    fin = processar_pdf_com_estado(fonte, workers, stats, backend, pouca_memoria, limite_rss_mb)
+    df = fin.dataframe()
+    _conferir_memoria(limite_rss_mb, fin.n_paginas, stats)
     return df
+
+def processar_pdf_com_estado(
+    fonte: FontePDF, workers: int = 1, stats: Optional[EstatisticasParser] = None, backend: str = "pdfplumber",
+    pouca_memoria: bool = False, limite_rss_mb: Optional[float] = None,
+) -> Finalizador:
+    """Como processar_pdf, mas para antes do DataFrame e devolve o Finalizador.
+
+    Para quem precisa do que cruza páginas além das linhas: a stoplist de CP
+    (fin.cp_keys) ou as COLUNAS_INTERNAS (fin.dataframe(internas=True)).
+    """
+    stats = stats or SEM_ESTATISTICAS
+    if pouca_memoria or limite_rss_mb is not None:
+        if workers > 1:
+            raise ValueError("pouca_memoria/limite_rss_mb só funcionam com workers=1")
+        return _finalizador_pouca_memoria(fonte, stats, backend, limite_rss_mb)
+    return _finalizador(extrair_paginas(fonte, workers=workers, stats=stats, backend=backend), stats)
+
+def _finalizador_pouca_memoria(fonte: FontePDF, stats, backend: str, limite_rss_mb: Optional[float]) -> Finalizador:
+    fin = Finalizador(stats)
+    with _abrir_medindo(fonte, backend, stats) as doc:
+        for page_idx in range(1, len(doc) + 1):
+            fin.adicionar(processar_pagina(_extrair_medindo(doc, page_idx, stats), page_idx, stats))
+            _conferir_memoria(limite_rss_mb, page_idx, stats)
+    return fin
+
+def _finalizador(paginas: Iterable[PaginaExtraida], stats) -> Finalizador:
+    fin = Finalizador(stats)
+    for page_idx, pag in enumerate(paginas, start=1):
+        fin.adicionar(processar_pagina(pag, page_idx, stats))
+    return fin
+
+def processar_paginas(paginas: Iterable[PaginaExtraida], stats: Optional[EstatisticasParser] = None) -> pd.DataFrame:
+    return _finalizador(paginas, stats or SEM_ESTATISTICAS).dataframe()
+
+def iter_transacoes(
+    fonte: FontePDF, finalizador: Optional[Finalizador] = None, backend: str = "pdfplumber"
+) -> Iterator[Transacao]:
+    """Entrega as transações de cada página assim que ela termina (extração sob demanda).
+
+    As linhas são provisórias: pagamentos, stoplist de CP, dedupe e as linhas de IOF
+    só se resolvem no fim. Passe um Finalizador e chame .dataframe() depois de
+    esgotar o gerador para obter o mesmo resultado de processar_pdf:
+
+        fin = Finalizador()
+        for t in iter_transacoes(pdf, fin):
+            ...
+        df = fin.dataframe()
+    """
+    fin = finalizador if finalizador is not None else Finalizador()
+    for page_idx, pag in enumerate(iter_paginas(fonte, fin.stats, backend), start=1):
+        res = processar_pagina(pag, page_idx, fin.stats)
+        fin.adicionar(res)
+        yield from res.passada_1
+        yield from res.passada_2
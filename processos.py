@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pool de processos do parser, compartilhado pelo servidor HTTP e pela fila do app.
+
+Os workers pagam o import pesado (pandas, pdfplumber, pypdfium2) uma vez, no
+initializer, e não no primeiro PDF. Quando um worker morre, o ProcessPoolExecutor
+inteiro fica inutilizável; reiniciar_pool troca por um novo, uma vez só.
+"""
+
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import List, Optional
+
+
+def aquecer() -> None:
+    # initializer do pool: paga o import pesado uma vez por worker. O parser importa
+    # pandas/pdfplumber só quando usa, então aqui eles vêm explícitos.
+    import numpy  # noqa: F401
+    import pandas  # noqa: F401
+    import pdfplumber  # noqa: F401
+    import pdfplumber.utils  # noqa: F401
+    import parser  # noqa: F401
+    import cache  # noqa: F401
+    try:
+        import pypdfium2  # noqa: F401  (sonda de páginas e backend pdfium)
+        import pypdfium2.raw  # noqa: F401
+    except ImportError:
+        pass
+
+
+def _nada() -> None:
+    pass
+
+
+def novo_pool(workers: int, mp_context=None) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=workers, mp_context=mp_context, initializer=aquecer)
+
+
+def aquecer_pool(pool: ProcessPoolExecutor, workers: int) -> List[Future]:
+    """Força a criação de todos os workers agora, não no primeiro PDF.
+
+    Não espera: devolve os futures (o spawn + imports leva segundos).
+    """
+    return [pool.submit(_nada) for _ in range(workers)]
+
+
+def reiniciar_pool(atual: Optional[ProcessPoolExecutor], quebrado: ProcessPoolExecutor,
+                   workers: int, mp_context=None) -> Optional[ProcessPoolExecutor]:
+    """Pool a usar depois de `quebrado` dar BrokenProcessPool: `atual`, se já foi trocado, ou um novo."""
+    # um worker morreu (ex.: crash no backend de PDF): o pool inteiro fica inutilizável.
+    # Todas as tarefas em andamento nele recebem BrokenProcessPool; só a primeira
+    # reinicia, senão as outras derrubariam (e cancelariam) o pool já novo.
+    # O pool novo aquece em segundo plano; o que chega antes só espera na fila dele.
+    if atual is not quebrado:
+        return atual
+    quebrado.shutdown(wait=False, cancel_futures=True)
+    novo = novo_pool(workers, mp_context)
+    aquecer_pool(novo, workers)
+    return novo
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Servidor HTTP do parser (asyncio, só stdlib) com pool de processos já aquecido.
+
+    POST /processar[?formato=csv|json]   corpo = bytes do PDF
+    GET  /saude                          estado do pool e da fila (JSON)
+
+Os workers importam parser/pandas/pdfplumber uma vez, na subida; cada pedido só
+paga o processamento. Contrapressão: no máximo `workers` PDFs em processamento e
+`fila` esperando; além disso responde 503 (com Retry-After). Cada pedido tem um
+prazo total (fila + processamento); estourou, responde 504 e o worker larga o PDF
+(alarme dentro do worker; se nem assim ele soltar, o pool é reciclado), para um
+PDF patológico não segurar a vaga depois da resposta.
+
+Uso:
+    python -m servidor --porta 8765 -j 4 --fila 16 --timeout 60
+    curl --data-binary @fatura.pdf "http://127.0.0.1:8765/processar?formato=json"
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from parser import BACKENDS
+from processos import aquecer_pool, novo_pool, reiniciar_pool
+
+MAX_CABECALHO = 64 * 1024
+GRACA_S = 5.0  # além do prazo, tempo que o worker tem para largar o PDF antes de o pool ser reciclado
+TIPOS = {
+    "csv": "text/csv; charset=utf-8",
+    "json": "application/json; charset=utf-8",
+}
+STATUS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    411: "Length Required", 413: "Payload Too Large", 422: "Unprocessable Entity",
+    500: "Internal Server Error", 503: "Service Unavailable", 504: "Gateway Timeout",
+}
+
+
+class PrazoEsgotado(Exception):
+    """O prazo do pedido acabou dentro do worker (ou antes de ele começar)."""
+
+
+class ErroHTTP(Exception):
+    def __init__(self, status: int, mensagem: str):
+        super().__init__(mensagem)
+        self.status = status
+
+
+# ---------------- workers (processos filhos) ----------------
+def _alarme(signum, frame) -> None:
+    raise PrazoEsgotado("prazo do pedido esgotado no worker")
+
+
+def _processar(dados: bytes, formato: str, backend: str, prazo: float) -> Tuple[bytes, int]:
+    from parser import processar_pdf
+
+    # prazo: time.time() absoluto; o pedido pode ter passado boa parte dele na fila
+    restante = prazo - time.time()
+    if restante <= 0:
+        raise PrazoEsgotado("prazo esgotado antes de o worker começar")
+    alarme = hasattr(signal, "setitimer")  # não existe no Windows: lá só vale a reciclagem
+    if alarme:
+        signal.signal(signal.SIGALRM, _alarme)
+        signal.setitimer(signal.ITIMER_REAL, restante)
+    try:
+        df = processar_pdf(dados, backend=backend)
+    finally:
+        if alarme:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    if formato == "json":
+        corpo = json.dumps(df.to_dict(orient="records"), ensure_ascii=False)
+    else:
+        corpo = df.to_csv(index=False)
+    return corpo.encode("utf-8"), len(df)
+
+
+# ---------------- servidor ----------------
+class ServidorParser:
+    """Pool de processos + limites de concorrência, fila e prazo por pedido."""
+
+    def __init__(self, workers: int = 2, fila: int = 8, timeout: float = 60.0,
+                 max_bytes: int = 50 * 1024 * 1024, backend: str = "pdfplumber"):
+        self.workers = workers
+        self.fila = fila
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.backend = backend
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._vagas: Optional[asyncio.Semaphore] = None
+        self._pendentes = 0       # aceitos e ainda sem resposta (na fila ou processando)
+        self._processando = 0     # ocupando um worker (inclui os que já estouraram o prazo)
+        self.contadores: Dict[str, int] = {"atendidos": 0, "rejeitados": 0, "timeouts": 0, "erros": 0,
+                                           "reciclagens": 0}
+
+    # --- pool ---
+    async def iniciar_pool(self) -> None:
+        self._pool = novo_pool(self.workers)
+        # espera o aquecimento sem bloquear o event loop
+        try:
+            await asyncio.gather(*map(asyncio.wrap_future, aquecer_pool(self._pool, self.workers)))
+        except BrokenProcessPool:
+            pass  # o próximo pedido nele recebe o erro e reinicia
+
+    def encerrar_pool(self, esperar: bool = False) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=esperar, cancel_futures=True)
+            self._pool = None
+
+    def _reiniciar_pool(self, quebrado: ProcessPoolExecutor) -> None:
+        self._pool = reiniciar_pool(self._pool, quebrado, self.workers)
+
+    def _reciclar(self, pool: ProcessPoolExecutor, cfut) -> None:
+        # o worker passou do prazo + GRACA_S sem largar o PDF (preso em código C, por
+        # exemplo): mata os processos do pool, o que devolve todas as vagas dele
+        if cfut.done():
+            return
+        self.contadores["reciclagens"] += 1
+        processos = list((getattr(pool, "_processes", None) or {}).values())
+        self._reiniciar_pool(pool)
+        for proc in processos:
+            proc.terminate()
+
+    async def _executar(self, dados: bytes, formato: str, prazo: float) -> Tuple[bytes, int]:
+        loop = asyncio.get_running_loop()
+        await self._vagas.acquire()
+        pool = self._pool
+        try:
+            cfut = pool.submit(_processar, dados, formato, self.backend, prazo)
+        except BrokenProcessPool:
+            self._vagas.release()
+            self._reiniciar_pool(pool)
+            raise
+        except BaseException:
+            self._vagas.release()
+            raise
+        self._processando += 1
+
+        def _liberar(_) -> None:
+            # só devolve a vaga quando o worker termina de fato, mesmo após um 504
+            self._processando -= 1
+            self._vagas.release()
+
+        cfut.add_done_callback(lambda f: loop.call_soon_threadsafe(_liberar, f))
+        try:
+            return await asyncio.wrap_future(cfut)
+        except BrokenProcessPool:
+            self._reiniciar_pool(pool)
+            raise
+        except asyncio.CancelledError:
+            # 504: o cliente já foi respondido; o alarme no worker deve soltar a vaga logo
+            loop.call_later(GRACA_S, self._reciclar, pool, cfut)
+            raise
+
+    async def processar(self, dados: bytes, formato: str) -> Tuple[bytes, int]:
+        if self._pendentes >= self.workers + self.fila:
+            self.contadores["rejeitados"] += 1
+            raise ErroHTTP(503, "fila cheia")
+        self._pendentes += 1
+        try:
+            prazo = time.time() + self.timeout
+            return await asyncio.wait_for(self._executar(dados, formato, prazo), self.timeout)
+        except asyncio.TimeoutError:
+            self.contadores["timeouts"] += 1
+            raise ErroHTTP(504, f"processamento passou de {self.timeout:g}s") from None
+        except PrazoEsgotado:
+            self.contadores["timeouts"] += 1
+            raise ErroHTTP(504, f"processamento passou de {self.timeout:g}s") from None
+        except BrokenProcessPool:
+            self.contadores["erros"] += 1
+            raise ErroHTTP(500, "worker do parser caiu; pool reiniciado") from None
+        except Exception as e:
+            self.contadores["erros"] += 1
+            raise ErroHTTP(422, f"{type(e).__name__}: {e}") from None
+        finally:
+            self._pendentes -= 1
+
+    def saude(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "processando": self._processando,
+            "na_fila": max(0, self._pendentes - self._processando),
+            "limite_fila": self.fila,
+            "backend": self.backend,
+            **self.contadores,
+        }
+
+    # --- HTTP ---
+    async def _ler_pedido(self, reader: asyncio.StreamReader) -> Tuple[str, str, Dict[str, str], bytes]:
+        try:
+            bruto = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.LimitOverrunError:
+            raise ErroHTTP(400, "cabeçalho grande demais") from None
+        linhas = bruto.decode("latin-1").split("\r\n")
+        try:
+            metodo, alvo, _ = linhas[0].split(" ", 2)
+        except ValueError:
+            raise ErroHTTP(400, "linha de pedido inválida") from None
+        cabecalhos = {}
+        for ln in linhas[1:]:
+            if ":" in ln:
+                nome, valor = ln.split(":", 1)
+                cabecalhos[nome.strip().lower()] = valor.strip()
+
+        corpo = b""
+        if metodo == "POST":
+            if "content-length" not in cabecalhos:
+                raise ErroHTTP(411, "Content-Length obrigatório")
+            try:
+                tamanho = int(cabecalhos["content-length"])
+            except ValueError:
+                raise ErroHTTP(400, "Content-Length inválido") from None
+            if tamanho > self.max_bytes:
+                raise ErroHTTP(413, f"PDF maior que {self.max_bytes} bytes")
+            corpo = await reader.readexactly(tamanho)
+        return metodo, alvo, cabecalhos, corpo
+
+    async def _rotear(self, metodo: str, alvo: str, cabecalhos: Dict[str, str], corpo: bytes) -> Tuple[int, str, bytes, Dict[str, str]]:
+        url = urlsplit(alvo)
+        if url.path == "/saude":
+            if metodo != "GET":
+                raise ErroHTTP(405, "use GET")
+            return 200, TIPOS["json"], json.dumps(self.saude()).encode(), {}
+        if url.path != "/processar":
+            raise ErroHTTP(404, "rota desconhecida")
+        if metodo != "POST":
+            raise ErroHTTP(405, "use POST com o PDF no corpo")
+
+        formato = (parse_qs(url.query).get("formato") or [""])[0].lower()
+        if not formato:
+            formato = "json" if "application/json" in cabecalhos.get("accept", "") else "csv"
+        if formato not in TIPOS:
+            raise ErroHTTP(400, "formato deve ser csv ou json")
+        if not corpo.startswith(b"%PDF"):
+            raise ErroHTTP(400, "o corpo não parece um PDF")
+
+        t0 = time.perf_counter()
+        saida, n_linhas = await self.processar(corpo, formato)
+        self.contadores["atendidos"] += 1
+        extras = {"X-Linhas": str(n_linhas), "X-Tempo-Ms": f"{(time.perf_counter() - t0) * 1000:.0f}"}
+        return 200, TIPOS[formato], saida, extras
+
+    async def atender(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        extras: Dict[str, str] = {}
+        try:
+            metodo, alvo, cabecalhos, corpo = await self._ler_pedido(reader)
+            status, tipo, saida, extras = await self._rotear(metodo, alvo, cabecalhos, corpo)
+        except ErroHTTP as e:
+            status, tipo = e.status, TIPOS["json"]
+            saida = json.dumps({"erro": str(e)}, ensure_ascii=False).encode("utf-8")
+            if e.status == 503:
+                extras = {"Retry-After": "1"}
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+
+        cabecalho = [f"HTTP/1.1 {status} {STATUS.get(status, '')}",
+                     f"Content-Type: {tipo}", f"Content-Length: {len(saida)}", "Connection: close"]
+        cabecalho += [f"{k}: {v}" for k, v in extras.items()]
+        try:
+            writer.write(("\r\n".join(cabecalho) + "\r\n\r\n").encode("latin-1") + saida)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def servir(self, host: str, porta: int) -> None:
+        self._vagas = asyncio.Semaphore(self.workers)
+        await self.iniciar_pool()
+        try:
+            server = await asyncio.start_server(self.atender, host, porta, limit=MAX_CABECALHO)
+            enderecos = ", ".join(f"{s.getsockname()[0]}:{s.getsockname()[1]}" for s in server.sockets)
+            print(f"servindo em {enderecos} ({self.workers} workers, fila {self.fila}, "
+                  f"timeout {self.timeout:g}s, backend {self.backend})", flush=True)
+            # SIGTERM/SIGINT: para de aceitar e derruba os workers junto (sem órfãos)
+            parar = asyncio.Event()
+            loop = asyncio.get_running_loop()
+            for sinal in (signal.SIGTERM, signal.SIGINT):
+                try:
+                    loop.add_signal_handler(sinal, parar.set)
+                except NotImplementedError:  # Windows
+                    pass
+            async with server:
+                await parar.wait()
+        finally:
+            self.encerrar_pool(esperar=True)
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m servidor", description="API HTTP do parser de faturas Itaú.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--porta", type=int, default=8765)
+    ap.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1, help="processos do parser")
+    ap.add_argument("--fila", type=int, default=8, help="pedidos esperando worker antes de responder 503")
+    ap.add_argument("--timeout", type=float, default=60.0, help="prazo por pedido, em segundos (fila + processamento)")
+    ap.add_argument("--max-mb", type=float, default=50.0, help="tamanho máximo do PDF")
+    ap.add_argument("--backend", choices=sorted(BACKENDS), default="pdfplumber", help="leitor de PDF")
+    args = ap.parse_args(argv)
+
+    servidor = ServidorParser(
+        workers=max(1, args.workers), fila=max(0, args.fila), timeout=args.timeout,
+        max_bytes=int(args.max_mb * 1024 * 1024), backend=args.backend,
+    )
+    asyncio.run(servidor.servir(args.host, args.porta))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fila de processamento em segundo plano, compartilhada entre sessões do app.
+
+Cada PDF vira uma tarefa num ProcessPoolExecutor, identificada pelo SHA-256 dos
+bytes: o mesmo arquivo enviado de novo (por qualquer usuário) reaproveita a
+tarefa, pronta ou em andamento. O worker usa processar_pdf_cache, então também
+vale o cache em disco por PDF e por página. O progresso (páginas prontas/total)
+volta por um dict do multiprocessing.Manager.
+
+No app, a fila é um st.cache_resource; nada aqui depende do Streamlit.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from typing import TYPE_CHECKING, Optional, Tuple
+
+from processos import novo_pool, reiniciar_pool
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+MAX_TAREFAS = 64  # tarefas prontas guardadas em memória (as mais antigas saem primeiro)
+
+
+# ---------------- worker (processo filho) ----------------
+def _processar(chave: str, dados: bytes, progresso, backend: str) -> pd.DataFrame:
+    from cache import processar_pdf_cache
+
+    def _avisar(feitas: int, total: int) -> None:
+        progresso[chave] = (feitas, total)
+
+    df = processar_pdf_cache(dados, progresso=_avisar, backend=backend)
+    total = progresso.get(chave, (0, 0))[1]
+    progresso[chave] = (total, total)
+    return df
+
+
+# ---------------- fila ----------------
+class FilaProcessamento:
+    """Pool de processos + tarefas por hash do PDF, com progresso por página."""
+
+    def __init__(self, workers: Optional[int] = None, max_tarefas: int = MAX_TAREFAS,
+                 backend: str = "pdfplumber"):
+        import multiprocessing
+
+        # spawn: o servidor do Streamlit tem várias threads, e fork com threads pode travar
+        self._ctx = multiprocessing.get_context("spawn")
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.max_tarefas = max_tarefas
+        self.backend = backend
+        self._manager = self._ctx.Manager()
+        self._progresso = self._manager.dict()
+        self._pool = novo_pool(self.workers, self._ctx)
+        self._tarefas: "OrderedDict[str, Future]" = OrderedDict()
+        self._lock = threading.Lock()  # o Streamlit roda cada sessão numa thread
+
+    @staticmethod
+    def chave(dados: bytes) -> str:
+        from cache import sha256_fonte
+
+        return sha256_fonte(dados)
+
+    def enviar(self, dados: bytes) -> str:
+        """Agenda o PDF (se ainda não houver tarefa para ele) e devolve a chave."""
+        chave = self.chave(dados)
+        with self._lock:
+            fut = self._tarefas.get(chave)
+            if fut is not None and not (fut.done() and fut.exception() is not None):
+                self._tarefas.move_to_end(chave)
+                return chave
+            self._progresso[chave] = (0, 0)
+            pool = self._pool
+            try:
+                fut = pool.submit(_processar, chave, dados, self._progresso, self.backend)
+            except BrokenProcessPool:
+                self._pool = reiniciar_pool(self._pool, pool, self.workers, self._ctx)
+                fut = self._pool.submit(_processar, chave, dados, self._progresso, self.backend)
+            self._tarefas[chave] = fut
+            self._despejar()
+        return chave
+
+    def _despejar(self) -> None:
+        # só descarta tarefas já terminadas; as em andamento ficam
+        prontas = [c for c, f in self._tarefas.items() if f.done()]
+        for chave in prontas[: max(0, len(self._tarefas) - self.max_tarefas)]:
+            del self._tarefas[chave]
+            self._progresso.pop(chave, None)
+
+    def estado(self, chave: str) -> str:
+        """"desconhecida", "na_fila", "processando", "pronta" ou "erro"."""
+        with self._lock:
+            fut = self._tarefas.get(chave)
+        if fut is None:
+            return "desconhecida"
+        if fut.done():
+            return "erro" if fut.exception() is not None else "pronta"
+        return "processando" if fut.running() else "na_fila"
+
+    def progresso(self, chave: str) -> Tuple[int, int]:
+        """(páginas prontas, total); total 0 enquanto o PDF nem foi aberto."""
+        return tuple(self._progresso.get(chave, (0, 0)))
+
+    def resultado(self, chave: str) -> pd.DataFrame:
+        """DataFrame da tarefa (bloqueia se ainda não terminou; relança o erro do worker)."""
+        with self._lock:
+            fut = self._tarefas[chave]
+        return fut.result()
+
+    def erro(self, chave: str) -> Optional[BaseException]:
+        with self._lock:
+            fut = self._tarefas.get(chave)
+        return fut.exception() if fut is not None and fut.done() else None
+
+    def encerrar(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._manager.shutdown()